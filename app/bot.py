@@ -1,14 +1,42 @@
 # app/bot.py
-import os
-
-from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 
-load_dotenv()
-TOKEN = os.getenv("BOT_TOKEN")
+from config.config import load_config
+from app.utils.fsm_storage import PgStorage
+from app.utils.http_session import build_session
+
+_config = load_config()
 
-if not TOKEN:
+if not _config.bot.token:
     raise RuntimeError("BOT_TOKEN is not set in environment")
 
-bot = Bot(token=TOKEN)
-dp = Dispatcher()
+_http = _config.http
+
+bot = Bot(
+    token=_config.bot.token,
+    session=build_session(
+        pool_size=_http.pool_size,
+        keepalive_timeout=_http.keepalive_timeout,
+        request_timeout=_http.request_timeout,
+    ),
+)
+# рассылка нотифаера — через свой пул соединений, чтобы пачка
+# напоминаний не отнимала соединения у интерактивных запросов
+if _http.notifier_session:
+    notifier_bot = Bot(
+        token=_config.bot.token,
+        session=build_session(
+            pool_size=_http.notifier_pool_size,
+            keepalive_timeout=_http.keepalive_timeout,
+            request_timeout=_http.request_timeout,
+        ),
+    )
+else:
+    notifier_bot = bot
+
+# FSM в Postgres: переживает рестарт и общий для реплик;
+# пул поднимается в main() до первого апдейта.
+# FSM-middleware (dp.fsm) регистрирует main.install_update_middlewares —
+# после очереди пользователя, иначе состояние читается до своей очереди
+fsm_storage = PgStorage()
+dp = Dispatcher(storage=fsm_storage, disable_fsm=True)
@@ -1,20 +1,47 @@
 # app/db/core.py
+import asyncio
 import os
 import logging
 import secrets
-from typing import Optional
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import asyncpg
 
+from app.utils.metrics import Histogram
+from app.utils.update_context import current_stats
+
 logger = logging.getLogger(__name__)
 
+DB_ACQUIRE_WAIT = Histogram(
+    "db_acquire_wait_seconds",
+    "Ожидание свободного соединения в пуле",
+)
+DB_HOLD = Histogram(
+    "db_connection_hold_seconds",
+    "Время работы с соединением из пула (запросы одного обращения)",
+)
+
 _pool: Optional[asyncpg.pool.Pool] = None
+# отдельное соединение под LISTEN (не занимает слот пула)
+_listen_conn: Optional[asyncpg.Connection] = None
+# подписки и сбросы кэшей — чтобы повторить их на новом соединении
+_listen_subs: List[Tuple[str, Callable[[str], None]]] = []
+_listen_resets: List[Callable[[], None]] = []
+_listen_watchdog: Optional[asyncio.Task] = None
+_listen_lost: Optional[asyncio.Event] = None
+
+LISTEN_CHECK_INTERVAL = 30.0
+LISTEN_CHECK_TIMEOUT = 5.0
+LISTEN_RETRY_MAX_DELAY = 60.0
 
 
-async def init_db_and_schema() -> None:
+async def init_db_and_schema(min_size: int = 1, max_size: int = 5) -> None:
     """
     Поднимает пул соединений и создаёт таблицы, если их ещё нет.
     Вызывать один раз при старте приложения.
+    Размер пула задаётся процессом (бот, отдельный нотифаер и т.д.).
     """
     global _pool
     if _pool is not None:
@@ -24,8 +51,8 @@ async def init_db_and_schema() -> None:
     if not dsn:
         raise RuntimeError("DATABASE_URL не задан. Укажи его в .env")
 
-    _pool = await asyncpg.create_pool(dsn, min_size=1, max_size=5)
-    logger.info("Postgres pool создан")
+    _pool = await asyncpg.create_pool(dsn, min_size=min_size, max_size=max_size)
+    logger.info("Postgres pool создан (min=%d, max=%d)", min_size, max_size)
 
     async with _pool.acquire() as conn:
         # таблица задач + состояния
@@ -80,6 +107,42 @@ async def init_db_and_schema() -> None:
             """
         )
 
+        # флаг "пользователь недоступен" (заблокировал бота)
+        await conn.execute(
+            """
+            ALTER TABLE user_settings
+            ADD COLUMN IF NOT EXISTS is_unreachable BOOLEAN NOT NULL DEFAULT FALSE;
+            """
+        )
+
+        # ежедневная сводка: локальный час отправки (NULL = выключена)
+        # и локальная дата последней отправленной сводки
+        await conn.execute(
+            """
+            ALTER TABLE user_settings
+            ADD COLUMN IF NOT EXISTS digest_hour SMALLINT,
+            ADD COLUMN IF NOT EXISTS digest_sent_on DATE;
+            """
+        )
+
+        # состояния FSM aiogram (app.utils.fsm_storage.PgStorage)
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fsm_state (
+                bot_id                 BIGINT NOT NULL,
+                chat_id                BIGINT NOT NULL,
+                user_id                BIGINT NOT NULL,
+                thread_id              BIGINT NOT NULL DEFAULT 0,
+                business_connection_id TEXT   NOT NULL DEFAULT '',
+                destiny                TEXT   NOT NULL DEFAULT 'default',
+                state                  TEXT,
+                data                   JSONB  NOT NULL DEFAULT '{}'::jsonb,
+                updated_at             TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+            );
+            """
+        )
+
     logger.info("Схема БД проверена/создана")
 
 
@@ -89,8 +152,154 @@ async def get_pool() -> asyncpg.pool.Pool:
     return _pool
 
 
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Соединение из пула с учётом: ожидание пула и время работы
+    идут в метрики и в статистику текущего апдейта (UpdateStats).
+    """
+    pool = await get_pool()
+    started = time.perf_counter()
+    async with pool.acquire() as conn:
+        acquired = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            done = time.perf_counter()
+            DB_ACQUIRE_WAIT.observe(acquired - started)
+            DB_HOLD.observe(done - acquired)
+            stats = current_stats()
+            if stats is not None:
+                stats.db_calls += 1
+                stats.db_seconds += done - started
+
+
+async def listen(
+    channel: str,
+    callback: Callable[[str], None],
+    on_reconnect: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Подписка на Postgres NOTIFY: callback(payload) вызывается на каждое
+    уведомление в канале. Все подписки процесса делят одно соединение.
+
+    Соединение проверяется в фоне; если оно потеряно, подписки
+    повторяются на новом, а затем вызывается on_reconnect() — пока
+    соединения не было, уведомления терялись, и кэш, который они
+    инвалидируют, надо сбросить.
+    """
+    global _listen_watchdog, _listen_lost
+    _listen_subs.append((channel, callback))
+    if on_reconnect is not None:
+        _listen_resets.append(on_reconnect)
+
+    if _listen_conn is None or _listen_conn.is_closed():
+        await _listen_connect()
+    else:
+        await _listen_conn.add_listener(channel, _notify_handler(callback))
+
+    if _listen_watchdog is None or _listen_watchdog.done():
+        _listen_lost = asyncio.Event()
+        _listen_watchdog = asyncio.create_task(_watch_listen_conn())
+
+
+def _notify_handler(callback: Callable[[str], None]):
+    def _on_notify(conn, pid, channel_name, payload):
+        try:
+            callback(payload)
+        except Exception:
+            logger.exception("Ошибка обработки NOTIFY %s: %r", channel_name, payload)
+
+    return _on_notify
+
+
+def _on_listen_terminated(conn) -> None:
+    if _listen_lost is not None:
+        _listen_lost.set()
+
+
+async def _listen_connect() -> None:
+    global _listen_conn
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL не задан. Укажи его в .env")
+    conn = await asyncpg.connect(dsn)
+    try:
+        for channel, callback in _listen_subs:
+            await conn.add_listener(channel, _notify_handler(callback))
+    except BaseException:
+        conn.terminate()
+        raise
+    conn.add_termination_listener(_on_listen_terminated)
+    _listen_conn = conn
+
+
+async def _listen_alive() -> bool:
+    conn = _listen_conn
+    if conn is None or conn.is_closed():
+        return False
+    try:
+        await conn.fetchval("SELECT 1", timeout=LISTEN_CHECK_TIMEOUT)
+    except Exception:
+        return False
+    return True
+
+
+async def _listen_reconnect() -> None:
+    if _listen_conn is not None and not _listen_conn.is_closed():
+        _listen_conn.terminate()
+    delay = 1.0
+    while True:
+        try:
+            await _listen_connect()
+            break
+        except Exception as exc:
+            logger.warning(
+                "LISTEN: не удалось переподключиться (%s), повтор через %.0fs", exc, delay
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX_DELAY)
+
+    for reset in _listen_resets:
+        try:
+            reset()
+        except Exception:
+            logger.exception("LISTEN: ошибка сброса кэша после переподключения")
+    logger.warning(
+        "LISTEN: соединение восстановлено, подписок %d, кэшей сброшено %d",
+        len(_listen_subs),
+        len(_listen_resets),
+    )
+
+
+async def _watch_listen_conn() -> None:
+    """
+    Фоновая проверка соединения LISTEN: сразу по обрыву (termination
+    listener) и раз в LISTEN_CHECK_INTERVAL — на случай «тихо» пропавшей сети.
+    """
+    while True:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(_listen_lost.wait(), LISTEN_CHECK_INTERVAL)
+        _listen_lost.clear()
+        if await _listen_alive():
+            continue
+        logger.warning("LISTEN: соединение потеряно, переподключаемся")
+        await _listen_reconnect()
+
+
 async def close_db() -> None:
-    global _pool
+    global _pool, _listen_conn, _listen_watchdog
+    # сначала сторож — иначе закрытие соединения он примет за обрыв
+    if _listen_watchdog is not None:
+        _listen_watchdog.cancel()
+        with suppress(asyncio.CancelledError):
+            await _listen_watchdog
+        _listen_watchdog = None
+    _listen_subs.clear()
+    _listen_resets.clear()
+    if _listen_conn is not None:
+        await _listen_conn.close()
+        _listen_conn = None
     if _pool is not None:
         await _pool.close()
         _pool = None
@@ -100,8 +309,7 @@ async def get_user_tz_offset(user_id: int) -> Optional[int]:
     """
     Возвращает смещение в минутах или None, если пользователь ещё не настраивал время.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         row = await conn.fetchrow(
             "SELECT tz_offset_minutes FROM user_settings WHERE user_id = $1",
             user_id,
@@ -115,8 +323,7 @@ async def set_user_tz_offset(user_id: int, offset_minutes: int) -> None:
     """
     Сохраняет/обновляет смещение в минутах для пользователя.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         await conn.execute(
             """
             INSERT INTO user_settings (user_id, tz_offset_minutes)
@@ -129,6 +336,122 @@ async def set_user_tz_offset(user_id: int, offset_minutes: int) -> None:
         )
 
 
+async def get_user_digest_hour(user_id: int) -> Optional[int]:
+    """
+    Локальный час ежедневной сводки или None, если сводка выключена.
+    """
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT digest_hour FROM user_settings WHERE user_id = $1",
+            user_id,
+        )
+    if row is None or row["digest_hour"] is None:
+        return None
+    return int(row["digest_hour"])
+
+
+async def set_user_digest_hour(user_id: int, hour: Optional[int]) -> None:
+    """
+    Включает ежедневную сводку на локальный час `hour` (0..23)
+    или выключает её, если hour = None.
+
+    Если этот час сегодня уже прошёл, сегодняшняя сводка считается
+    отправленной — первая придёт завтра в `hour`, а не сейчас.
+    local = UTC - tz_offset_minutes, как в claim_daily_digests().
+    """
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO user_settings (user_id, digest_hour)
+            VALUES ($1, $2)
+            ON CONFLICT (user_id) DO UPDATE
+            SET digest_hour = EXCLUDED.digest_hour,
+                digest_sent_on = CASE
+                    WHEN EXCLUDED.digest_hour IS NOT NULL
+                     AND EXTRACT(HOUR FROM (now() AT TIME ZONE 'UTC')
+                         - make_interval(mins => user_settings.tz_offset_minutes))
+                         > EXCLUDED.digest_hour
+                    THEN GREATEST(
+                        user_settings.digest_sent_on,
+                        ((now() AT TIME ZONE 'UTC')
+                         - make_interval(mins => user_settings.tz_offset_minutes))::date
+                    )
+                    ELSE user_settings.digest_sent_on
+                END
+            """,
+            user_id,
+            hour,
+        )
+
+
+async def mark_user_unreachable(user_id: int) -> None:
+    """
+    Помечает пользователя недоступным (бот получил TelegramForbiddenError).
+    Такие пользователи не попадают в выборку нотифаера.
+    Строки настроек может не быть (время и токен не настраивались) —
+    тогда она создаётся.
+    """
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO user_settings (user_id, is_unreachable)
+            VALUES ($1, TRUE)
+            ON CONFLICT (user_id) DO UPDATE
+            SET is_unreachable = TRUE
+            WHERE NOT user_settings.is_unreachable
+            """,
+            user_id,
+        )
+
+
+async def load_user_context(user_id: int, chat_id: int, with_ui: bool = True) -> Dict[str, Any]:
+    """
+    Всё, что нужно хендлерам о пользователе, одним запросом:
+    настройки (tz_offset_minutes, web_token, digest_hour, is_unreachable;
+    None — строки нет) и, если with_ui, message_id экрана в этом чате.
+    Только читает — флаг недоступности снимает clear_user_unreachable.
+    """
+    async with acquire() as conn:
+        if with_ui:
+            row = await conn.fetchrow(
+                """
+                SELECT s.tz_offset_minutes, s.web_token, s.digest_hour,
+                       s.is_unreachable, ui.message_id
+                FROM (SELECT $1::bigint AS user_id) k
+                LEFT JOIN user_settings s ON s.user_id = k.user_id
+                LEFT JOIN ui_state ui ON ui.user_id = k.user_id AND ui.chat_id = $2
+                """,
+                user_id,
+                chat_id,
+            )
+        else:
+            row = await conn.fetchrow(
+                """
+                SELECT s.tz_offset_minutes, s.web_token, s.digest_hour,
+                       s.is_unreachable, NULL::bigint AS message_id
+                FROM (SELECT $1::bigint AS user_id) k
+                LEFT JOIN user_settings s ON s.user_id = k.user_id
+                """,
+                user_id,
+            )
+    return dict(row)
+
+
+async def clear_user_unreachable(user_id: int) -> None:
+    """
+    Снимает флаг недоступности — пользователь сам написал боту.
+    """
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE user_settings
+            SET is_unreachable = FALSE
+            WHERE user_id = $1 AND is_unreachable
+            """,
+            user_id,
+        )
+
+
 WEB_TOKEN_BYTES = 32  # минимум 32 байта энтропии
 
 
@@ -141,8 +464,7 @@ async def get_or_create_web_token(user_id: int) -> str:
     """
     Вернёт существующий web_token пользователя или создаст новый.
     """
-    global _pool
-    async with _pool.acquire() as conn:  # type: ignore[union-attr]
+    async with acquire() as conn:
         row = await conn.fetchrow(
             "SELECT web_token FROM user_settings WHERE user_id = $1",
             user_id,
@@ -169,9 +491,8 @@ async def rotate_web_token(user_id: int) -> str:
     """
     Всегда создаёт новый web_token, старый становится невалидным.
     """
-    global _pool
     token = _generate_web_token()
-    async with _pool.acquire() as conn:  # type: ignore[union-attr]
+    async with acquire() as conn:
         await conn.execute(
             """
             UPDATE user_settings
@@ -192,8 +513,7 @@ async def get_user_id_by_token(token: str) -> Optional[int]:
     if not token:
         return None
 
-    global _pool
-    async with _pool.acquire() as conn:  # type: ignore[union-attr]
+    async with acquire() as conn:
         row = await conn.fetchrow(
             "SELECT user_id FROM user_settings WHERE web_token = $1",
             token,
@@ -1,5 +1,5 @@
 # app/handlers/start.py
-from typing import Union
+from typing import Optional, Union
 import os
 import datetime as dt
 
@@ -14,13 +14,15 @@ from aiogram.types import (
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
+from app.services.cleanup import schedule_delete
+from app.utils.update_context import answer_callback
 from app.utils.ui import show_screen
 from app.states.time_settings import TimeSettingsStates
+from app.utils import user_context
 from app.db.core import (
-    get_user_tz_offset,
     set_user_tz_offset,
-    get_or_create_web_token,
     rotate_web_token,
+    set_user_digest_hour,
 )
 
 start_router = Router()
@@ -44,7 +46,8 @@ HELP_TEXT = (
     "• ➕ Добавить задачу\n"
     "• 📋 Показать список задач\n"
     "• 🌐 Открыть веб-интерфейс\n"
-    "• 🕒 Настроить время\n\n"
+    "• 🕒 Настроить время\n"
+    "• 📬 Ежедневная сводка\n\n"
     "Используй кнопки ниже."
 )
 
@@ -89,6 +92,12 @@ def build_help_keyboard() -> InlineKeyboardMarkup:
                     callback_data="cmd_time",
                 ),
             ],
+            [
+                InlineKeyboardButton(
+                    text="📬 Ежедневная сводка",
+                    callback_data="cmd_digest",
+                ),
+            ],
         ]
     )
 
@@ -106,6 +115,60 @@ def build_time_keyboard() -> InlineKeyboardMarkup:
     )
 
 
+# локальные часы, доступные для ежедневной сводки
+DIGEST_HOURS = (6, 7, 8, 9, 10, 11)
+
+
+def build_digest_keyboard(current: Optional[int]) -> InlineKeyboardMarkup:
+    rows: list[list[InlineKeyboardButton]] = []
+    row: list[InlineKeyboardButton] = []
+    for h in DIGEST_HOURS:
+        label = f"{h:02d}:00"
+        row.append(
+            InlineKeyboardButton(
+                text=f"[{label}]" if h == current else label,
+                callback_data=f"digest:set:{h}",
+            )
+        )
+        if len(row) == 3:
+            rows.append(row)
+            row = []
+    if row:
+        rows.append(row)
+
+    if current is not None:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text="Выключить сводку",
+                    callback_data="digest:off",
+                )
+            ]
+        )
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text="⬅️ Назад к командам",
+                callback_data="cmd_help",
+            )
+        ]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def _digest_text(current: Optional[int]) -> str:
+    status = (
+        f"включена, приходит в {current:02d}:00 по твоему времени"
+        if current is not None
+        else "выключена"
+    )
+    return (
+        "Ежедневная сводка: одно сообщение с просроченными задачами "
+        "и задачами на сегодня.\n\n"
+        f"Сейчас: {status}.\n"
+        "Выбери час отправки:"
+    )
+
 
 def build_site_keyboard(token: str) -> InlineKeyboardMarkup:
     python_url = f"{PYTHON_BASE}/?token={token}"
@@ -145,13 +208,13 @@ async def start_cmd(
 ):
     # 1. user_id из Message или CallbackQuery
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
         user_id = event.from_user.id
     else:
         user_id = event.from_user.id
 
     # 2. проверяем, настроен ли часовой пояс
-    offset = await get_user_tz_offset(user_id)
+    offset = await user_context.get_tz_offset(user_id)
     if offset is None:
         now = dt.datetime.now()
         server_time_str = now.strftime("%H:%M")
@@ -172,10 +235,7 @@ async def start_cmd(
 
     # 3. обычный стартовый экран
     if isinstance(event, Message):
-        try:
-            await event.delete()  # убрать /start из чата
-        except Exception:
-            pass
+        schedule_delete(event)  # убрать /start из чата
 
     await show_screen(event, START_TEXT, reply_markup=build_start_keyboard())
 
@@ -188,15 +248,9 @@ async def start_cmd(
 @start_router.callback_query(F.data == "cmd_help")
 async def help_cmd(event: Union[Message, CallbackQuery]):
     if isinstance(event, Message):
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
     else:
-        try:
-            await event.answer()
-        except Exception:
-            pass
+        await answer_callback(event)
 
     await show_screen(event, HELP_TEXT, reply_markup=build_help_keyboard())
 
@@ -207,16 +261,13 @@ async def help_cmd(event: Union[Message, CallbackQuery]):
 @start_router.callback_query(F.data == "cmd_site")
 async def cmd_site(event: Union[Message, CallbackQuery]):
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
         user_id = event.from_user.id
     else:
         user_id = event.from_user.id
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
 
-    token = await get_or_create_web_token(user_id)
+    token = await user_context.get_web_token(user_id)
     kb = build_site_keyboard(token)
 
     await show_screen(
@@ -228,7 +279,7 @@ async def cmd_site(event: Union[Message, CallbackQuery]):
 
 @start_router.callback_query(F.data == "web:reset_token")
 async def cb_web_reset_token(query: CallbackQuery):
-    await query.answer()
+    await answer_callback(query)
 
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -260,10 +311,11 @@ async def cb_web_reset_token(query: CallbackQuery):
 
 @start_router.callback_query(F.data == "web:reset_token:confirm")
 async def cb_web_reset_token_confirm(query: CallbackQuery):
-    await query.answer()
+    await answer_callback(query)
     user_id = query.from_user.id
 
     new_token = await rotate_web_token(user_id)
+    user_context.remember(user_id, web_token=new_token)
     kb = build_site_keyboard(new_token)
 
     await show_screen(
@@ -274,13 +326,56 @@ async def cb_web_reset_token_confirm(query: CallbackQuery):
 
 
 
+# ===== /digest (+ callback cmd_digest) — ежедневная сводка =====
+
+@start_router.message(Command("digest"))
+@start_router.callback_query(F.data == "cmd_digest")
+async def cmd_digest(event: Union[Message, CallbackQuery]):
+    if isinstance(event, CallbackQuery):
+        await answer_callback(event)
+    else:
+        schedule_delete(event)
+
+    current = await user_context.get_digest_hour(event.from_user.id)
+    await show_screen(
+        event,
+        _digest_text(current),
+        reply_markup=build_digest_keyboard(current),
+    )
+
+
+@start_router.callback_query(F.data.startswith("digest:"))
+async def cb_digest_set(query: CallbackQuery):
+    parts = (query.data or "").split(":")
+    if parts[1:] == ["off"]:
+        hour = None
+    else:
+        try:
+            hour = int(parts[2])
+        except (IndexError, ValueError):
+            await answer_callback(query, "Некорректное значение.", show_alert=True)
+            return
+        if hour not in DIGEST_HOURS:
+            await answer_callback(query, "Некорректное значение.", show_alert=True)
+            return
+
+    await answer_callback(query, "Сводка выключена." if hour is None else "Сводка включена.")
+    await set_user_digest_hour(query.from_user.id, hour)
+    user_context.remember(query.from_user.id, digest_hour=hour)
+    await show_screen(
+        query,
+        _digest_text(hour),
+        reply_markup=build_digest_keyboard(hour),
+    )
+
+
 # ===== /time (+ callback cmd_time) — переустановка часового пояса =====
 
 @start_router.message(Command("time"))
 @start_router.callback_query(F.data == "cmd_time")
 async def cmd_time(event: Union[Message, CallbackQuery], state: FSMContext):
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
 
     now = dt.datetime.now()
     server_time_str = now.strftime("%H:%M")
@@ -300,7 +395,7 @@ async def cmd_time(event: Union[Message, CallbackQuery], state: FSMContext):
 
 @start_router.callback_query(F.data == "cmd_time_cancel")
 async def cmd_time_cancel(event: CallbackQuery, state: FSMContext):
-    await event.answer()
+    await answer_callback(event)
     await state.clear()
     await show_screen(
         event,
@@ -315,10 +410,7 @@ async def cmd_time_cancel(event: CallbackQuery, state: FSMContext):
 @start_router.message(TimeSettingsStates.waiting_for_time)
 async def tz_handle_time_input(message: Message, state: FSMContext):
     text = (message.text or "").strip()
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    schedule_delete(message)
 
     # парсим HH:MM
     try:
@@ -368,6 +460,7 @@ async def tz_handle_time_input(message: Message, state: FSMContext):
     offset_minutes = diff  # tz_offset_minutes
 
     await set_user_tz_offset(message.from_user.id, offset_minutes)
+    user_context.remember(message.from_user.id, tz_offset_minutes=offset_minutes)
     await state.clear()
 
     await show_screen(
@@ -1,10 +1,12 @@
 # app/handlers/todo.py
-from typing import Optional, Union, List
+from typing import Optional, Union
 import datetime as dt
 import calendar
 import os
+from collections import OrderedDict
+from functools import lru_cache
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import (
     Message,
     CallbackQuery,
@@ -15,17 +17,30 @@ from aiogram.types import (
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 
-from app.utils import storage
-from app.keyboards.tasks_kb import tasks_page_keyboard, DEFAULT_PER_PAGE
+from app.utils import storage, ui_cache
+from app.utils.callback_router import CallbackData, CallbackRouter
+from app.keyboards.tasks_kb import (
+    tasks_page_keyboard,
+    delete_mode_keyboard,
+    selected_from_keyboard,
+    DEFAULT_PER_PAGE,
+    DELETE_PER_PAGE,
+)
 from app.states.todo_states import TodoStates
 from app.states.date_picker import DatePickerState
+from app.services.cleanup import schedule_delete
+from app.utils.update_context import answer_callback
 from app.utils.ui import show_notification, show_screen
 from app.utils.dates import format_dt
-from app.db.core import get_or_create_web_token, get_user_tz_offset
+from app.utils.nl_dates import parse_deadline, split_deadline
+from app.utils import user_context
 
 PYTHON_BASE = os.getenv("PYTHON_BASE", "http://127.0.0.1:8001")
 
 todo_router = Router()
+# все callback-кнопки роутера — через один диспетчер
+callbacks = CallbackRouter("todo")
+callbacks.attach(todo_router)
 
 
 # ======= ХЕЛПЕРЫ ДЛЯ ВЫБОРА ДАТЫ/ВРЕМЕНИ =======
@@ -66,16 +81,47 @@ def _dp_normalize_components(
     return year, month, day, hour, minute
 
 
-def _dp_current_dt(data: dict) -> dt.datetime:
-    year = int(data.get("dp_year"))
-    month = int(data.get("dp_month"))
-    day = int(data.get("dp_day"))
-    hour = int(data.get("dp_hour"))
-    minute = int(data.get("dp_minute"))
-    year, month, day, hour, minute = _dp_normalize_components(
-        year, month, day, hour, minute
+# ---- состояние пикера живёт в callback_data, без FSM ----
+# формат: dp:<op>:<task_id>:<YYYYMMDDhhmm>:<stage>
+#   op: d/m/h/i — выбран день/месяц/час/минуты, s — смена шага, save — сохранить
+
+DP_STAGES = ("day", "month", "hour", "minute", "year")
+
+
+def _dp_pack(year: int, month: int, day: int, hour: int, minute: int) -> str:
+    return f"{year:04d}{month:02d}{day:02d}{hour:02d}{minute:02d}"
+
+
+def _dp_unpack(packed: str) -> tuple[int, int, int, int, int]:
+    if len(packed) != 12 or not packed.isdigit():
+        raise ValueError(packed)
+    return _dp_normalize_components(
+        int(packed[0:4]),
+        int(packed[4:6]),
+        int(packed[6:8]),
+        int(packed[8:10]),
+        int(packed[10:12]),
     )
-    return dt.datetime(year, month, day, hour, minute)
+
+
+def _dp_stage(value: str) -> str:
+    if value not in DP_STAGES:
+        raise ValueError(value)
+    return value
+
+
+def _dp_cb(
+    op: str,
+    tid: int,
+    stage: str,
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+) -> str:
+    # влезает в 64 байта callback_data: "dp:save:<до 10 цифр>:<12 цифр>:minute"
+    return f"dp:{op}:{tid}:{_dp_pack(year, month, day, hour, minute)}:{stage}"
 
 
 def _dp_stage_label(stage: str) -> str:
@@ -108,16 +154,14 @@ def _dp_month_name(month: int) -> str:
 
 
 
-def _dp_text(data: dict) -> str:
-    dt_val = _dp_current_dt(data)
-    stage = data.get("dp_stage", "day")
-
-    year = dt_val.year
-    month = dt_val.month
-    day = dt_val.day
-    hour = dt_val.hour
-    minute = dt_val.minute
-
+def _dp_text(
+    stage: str,
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+) -> str:
     def line(field: str, label: str, value: str) -> str:
         if stage == field:
             return f"🔛 {label}: {value}"
@@ -136,235 +180,119 @@ def _dp_text(data: dict) -> str:
         "Текущие значения:\n"
         + "\n".join(lines)
         + "\n\n"
-        "Используй кнопки ниже для изменения.\n"
+        "Используй кнопки ниже для изменения\n"
+        "или отправь срок сообщением: «завтра 9:00», «через 2 часа»,\n"
+        "«пт 18:00», «2026-11-01 14:30».\n"
     )
 
 
 
-def _dp_build_kb_for_stage(
+# кнопка раскладки: (текст, op, аргумент) — для d/m/h/i аргумент это
+# новое значение поля, для "s" — целевой шаг, для "save" — None
+_DpButton = tuple[str, str, Optional[Union[int, str]]]
+_DP_FIELDS = {"d": "day", "m": "month", "h": "hour", "i": "minute"}
+_DP_MONTH_SHORT = (
+    "Янв", "Фев", "Мар", "Апр",
+    "Май", "Июн", "Июл", "Авг",
+    "Сен", "Окт", "Ноя", "Дек",
+)
+_DP_BACK = ("⬅️ Назад к задаче", "save", None)
+
+
+def _dp_grid(
+    op: str,
+    values: range,
+    selected: int,
+    per_row: int,
+    labels: Optional[tuple[str, ...]] = None,
+) -> list[tuple[_DpButton, ...]]:
+    rows = []
+    row: list[_DpButton] = []
+    for i, v in enumerate(values):
+        label = labels[i] if labels else str(v)
+        row.append((f"[{label}]" if v == selected else label, op, v))
+        if len(row) == per_row:
+            rows.append(tuple(row))
+            row = []
+    if row:
+        rows.append(tuple(row))
+    return rows
+
+
+@lru_cache(maxsize=256)
+def _dp_layout(
     stage: str,
-    year: int,
-    month: int,
-    day: int,
-    hour: int,
-    minute: int,
-) -> InlineKeyboardMarkup:
-    year, month, day, hour, minute = _dp_normalize_components(
-        year, month, day, hour, minute
-    )
-    rows: list[list[InlineKeyboardButton]] = []
-
+    selected: int,
+    max_day: int,
+) -> tuple[tuple[tuple[InlineKeyboardButton, str, Optional[Union[int, str]]], ...], ...]:
+    """
+    Раскладка клавиатуры шага — готовые кнопки без callback_data.
+    Зависит только от шага, выбранного значения и (для дней) длины
+    месяца, поэтому кэшируется с высоким попаданием; task_id и дата
+    подставляются в _dp_build_kb.
+    """
     if stage == "day":
-        max_day = calendar.monthrange(year, month)[1]
-        row: list[InlineKeyboardButton] = []
-        for d in range(1, max_day + 1):
-            text = f"[{d}]" if d == day else str(d)
-            row.append(
-                InlineKeyboardButton(
-                    text=text,
-                    callback_data=f"dp:set:day:{d}",
-                )
-            )
-            if len(row) == 7:
-                rows.append(row)
-                row = []
-        if row:
-            rows.append(row)
-
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Месяц", callback_data="dp:stage:month"
-                ),
-                InlineKeyboardButton(
-                    text="Год", callback_data="dp:stage:year"
-                ),
-            ]
-        )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Часы", callback_data="dp:stage:hour"
-                ),
-                InlineKeyboardButton(
-                    text="Минуты", callback_data="dp:stage:minute"
-                ),
-            ]
-        )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                ),
-            ]
-        )
-
+        rows = _dp_grid("d", range(1, max_day + 1), selected, 7)
+        rows.append((("Месяц", "s", "month"), ("Год", "s", "year")))
+        rows.append((("Часы", "s", "hour"), ("Минуты", "s", "minute")))
+        rows.append((_DP_BACK,))
     elif stage == "month":
-        month_names = [
-            "Янв", "Фев", "Мар", "Апр",
-            "Май", "Июн", "Июл", "Авг",
-            "Сен", "Окт", "Ноя", "Дек",
-        ]
-        row: list[InlineKeyboardButton] = []
-        for m in range(1, 13):
-            label = month_names[m - 1]
-            text = f"[{label}]" if m == month else label
-            row.append(
-                InlineKeyboardButton(
-                    text=text,
-                    callback_data=f"dp:set:month:{m}",
-                )
-            )
-            if len(row) == 4:
-                rows.append(row)
-                row = []
-        if row:
-            rows.append(row)
-
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="День", callback_data="dp:stage:day"
-                ),
-                InlineKeyboardButton(
-                    text="Часы", callback_data="dp:stage:hour"
-                ),
-                InlineKeyboardButton(
-                    text="Минуты", callback_data="dp:stage:minute"
-                ),
-            ]
-        )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Год", callback_data="dp:stage:year"
-                ),
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                ),
-            ]
-        )
-
+        rows = _dp_grid("m", range(1, 13), selected, 4, _DP_MONTH_SHORT)
+        rows.append((("День", "s", "day"), ("Часы", "s", "hour"), ("Минуты", "s", "minute")))
+        rows.append((("Год", "s", "year"), _DP_BACK))
     elif stage == "hour":
-        row: list[InlineKeyboardButton] = []
-        for h in range(0, 24):
-            text = f"[{h}]" if h == hour else str(h)
-            row.append(
-                InlineKeyboardButton(
-                    text=text,
-                    callback_data=f"dp:set:hour:{h}",
-                )
-            )
-            if len(row) == 6:
-                rows.append(row)
-                row = []
-        if row:
-            rows.append(row)
-
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="День", callback_data="dp:stage:day"
-                ),
-                InlineKeyboardButton(
-                    text="Месяц", callback_data="dp:stage:month"
-                ),
-                InlineKeyboardButton(
-                    text="Минуты", callback_data="dp:stage:minute"
-                ),
-            ]
-        )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Год", callback_data="dp:stage:year"
-                ),
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                ),
-            ]
-        )
-
+        rows = _dp_grid("h", range(0, 24), selected, 6)
+        rows.append((("День", "s", "day"), ("Месяц", "s", "month"), ("Минуты", "s", "minute")))
+        rows.append((("Год", "s", "year"), _DP_BACK))
     elif stage == "minute":
-        row: list[InlineKeyboardButton] = []
-        for m in range(0, 60, 5):
-            text = f"[{m}]" if m == minute else str(m)
-            row.append(
-                InlineKeyboardButton(
-                    text=text,
-                    callback_data=f"dp:set:minute:{m}",
-                )
-            )
-            if len(row) == 6:
-                rows.append(row)
-                row = []
-        if row:
-            rows.append(row)
-
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Часы", callback_data="dp:stage:hour"
-                ),
-                InlineKeyboardButton(
-                    text="День", callback_data="dp:stage:day"
-                ),
-                InlineKeyboardButton(
-                    text="Месяц", callback_data="dp:stage:month"
-                ),
-            ]
-        )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="Год", callback_data="dp:stage:year"
-                ),
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                ),
-            ]
-        )
-
+        rows = _dp_grid("i", range(0, 60, 5), selected, 6)
+        rows.append((("Часы", "s", "hour"), ("День", "s", "day"), ("Месяц", "s", "month")))
+        rows.append((("Год", "s", "year"), _DP_BACK))
     else:
-        # fallback, не должен использоваться
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="День", callback_data="dp:stage:day"
-                ),
-                InlineKeyboardButton(
-                    text="Год", callback_data="dp:stage:year"
-                ),
-            ]
+        # шаг 'год' — год вводится текстом, кнопки только навигации/сохранения
+        rows = [(("⬅️ К дню", "s", "day"),), (_DP_BACK,)]
+    return tuple(
+        tuple(
+            (InlineKeyboardButton(text=text, callback_data=op), op, arg)
+            for text, op, arg in row
         )
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                ),
-            ]
-        )
-
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+        for row in rows
+    )
 
 
-def _dp_build_kb_year() -> InlineKeyboardMarkup:
+def _dp_build_kb(
+    stage: str,
+    tid: int,
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+) -> InlineKeyboardMarkup:
     """
-    Клавиатура для шага 'год' — год вводится текстом,
-    кнопки только навигации/сохранения.
+    Клавиатура шага пикера. Каждая кнопка несёт в callback_data
+    полное состояние, в которое она переводит пикер: кнопки берутся
+    из кэша раскладки, здесь им только проставляется callback_data.
     """
+    values = dict(year=year, month=month, day=day, hour=hour, minute=minute)
+    selected = values.get(stage, 0)
+    max_day = calendar.monthrange(year, month)[1] if stage == "day" else 0
+    packed = _dp_pack(year, month, day, hour, minute)
+
+    def callback(op: str, arg: Optional[Union[int, str]]) -> str:
+        if op == "s":
+            return f"dp:s:{tid}:{packed}:{arg}"
+        if op == "save":
+            return f"dp:save:{tid}:{packed}:{stage}"
+        return _dp_cb(op, tid, stage, **{**values, _DP_FIELDS[op]: arg})
+
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(
-                    text="⬅️ К дню", callback_data="dp:stage:day"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="⬅️ Назад к задаче", callback_data="dp:save"
-                )
-            ],
+                button.model_copy(update={"callback_data": callback(op, arg)})
+                for button, op, arg in row
+            ]
+            for row in _dp_layout(stage, selected, max_day)
         ]
     )
 
@@ -382,30 +310,21 @@ def build_cancel_add_task_kb() -> InlineKeyboardMarkup:
     )
 
 
-async def _dp_show_screen(event: Union[Message, CallbackQuery], state: FSMContext) -> None:
-    data = await state.get_data()
-    stage = data.get("dp_stage", "day")
-
-    year = int(data.get("dp_year"))
-    month = int(data.get("dp_month"))
-    day = int(data.get("dp_day"))
-    hour = int(data.get("dp_hour"))
-    minute = int(data.get("dp_minute"))
-
+async def _dp_show_screen(
+    event: Union[Message, CallbackQuery],
+    tid: int,
+    stage: str,
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+) -> None:
     year, month, day, hour, minute = _dp_normalize_components(
         year, month, day, hour, minute
     )
 
-    normalized = {
-        "dp_year": year,
-        "dp_month": month,
-        "dp_day": day,
-        "dp_hour": hour,
-        "dp_minute": minute,
-        "dp_stage": stage,
-    }
-
-    text = _dp_text(normalized)
+    text = _dp_text(stage, year, month, day, hour, minute)
 
     if stage == "year":
         # доп. инструкции именно для ввода года
@@ -414,27 +333,25 @@ async def _dp_show_screen(event: Union[Message, CallbackQuery], state: FSMContex
             "Отправь новый год числом, например: 2026.\n"
             "Или нажми «К дню» или «Сохранить»."
         )
-        kb = _dp_build_kb_year()
-    else:
-        kb = _dp_build_kb_for_stage(stage, year, month, day, hour, minute)
 
+    kb = _dp_build_kb(stage, tid, year, month, day, hour, minute)
     await show_screen(event, text, reply_markup=kb)
 
 
 
 async def _dp_start_for_task(
     event: Union[Message, CallbackQuery],
-    state: FSMContext,
     task: dict,
 ) -> None:
     """
-    Старт пикера дат для задачи.
+    Старт пикера дат для задачи. FSM не трогает — всё состояние
+    пикера едет в callback_data кнопок.
     База для экрана:
       - если есть due_at (UTC/aware или наивная как UTC) -> переводим в ЛОКАЛЬ: UTC - offset
       - иначе "завтра 00:00" в ЛОКАЛИ пользователя
     """
     user_id = event.from_user.id
-    off = int((await get_user_tz_offset(user_id)) or 0)
+    off = int((await user_context.get_tz_offset(user_id)) or 0)
 
     base_local: dt.datetime
 
@@ -460,20 +377,17 @@ async def _dp_start_for_task(
             hour=0, minute=0, second=0, microsecond=0
         )
 
-    await state.set_state(DatePickerState.picking)
-    await state.set_data(
-        {
-            "dp_mode": "due",
-            "dp_task_id": task["id"],
-            "dp_stage": "day",
-            "dp_year": base_local.year,
-            "dp_month": base_local.month,
-            "dp_day": base_local.day,
-            "dp_hour": base_local.hour,
-            "dp_minute": base_local.minute,
-        }
+    await _dp_show_screen(
+        event,
+        task["id"],
+        "day",
+        base_local.year,
+        base_local.month,
+        base_local.day,
+        base_local.hour,
+        base_local.minute,
     )
-    await _dp_show_screen(event, state)
+
 
 
 
@@ -488,7 +402,7 @@ async def render_tasks_screen(
     tasks = await storage.list_user_tasks(user_id)
 
     # ссылку на сайт считаем один раз
-    token = await get_or_create_web_token(user_id)
+    token = await user_context.get_web_token(user_id)
     site_url = f"{PYTHON_BASE}/?token={token}"
 
     if not tasks:
@@ -558,7 +472,7 @@ async def render_task_card(
     user_id = event.from_user.id
 
     # minutes to SUBTRACT from UTC to get user's local
-    offset = await get_user_tz_offset(user_id)
+    offset = await user_context.get_tz_offset(user_id)
     off = int(offset or 0)
 
     def _fmt_utc_iso_to_local_str(iso_str: Optional[str]) -> str:
@@ -605,7 +519,7 @@ async def render_task_card(
     if prefix:
         text = prefix + "\n\n" + text
 
-    token = await get_or_create_web_token(user_id)
+    token = await user_context.get_web_token(user_id)
     detail_url = f"{PYTHON_BASE}/tasks/{tid}?token={token}"
 
     kb = InlineKeyboardMarkup(
@@ -634,30 +548,20 @@ async def render_task_card(
 # --------- /list + пагинация ---------
 
 @todo_router.message(Command("list"))
-@todo_router.callback_query(F.data == "cmd_list")
-@todo_router.callback_query(F.data.startswith("tasks:page:"))
-async def list_handler(event: Union[Message, CallbackQuery]):
+@callbacks.route("cmd", "list")
+@callbacks.route("tasks", "page", int)
+async def list_handler(
+    event: Union[Message, CallbackQuery],
+    cb: Optional[CallbackData] = None,
+):
+    user_id = event.from_user.id
+    page = 0
     if isinstance(event, Message):
-        try:
-            await event.delete()
-        except Exception:
-            pass
-        user_id = event.from_user.id
-        page = 0
+        schedule_delete(event)
     else:
-        try:
-            await event.answer()
-        except Exception:
-            pass
-
-        user_id = event.from_user.id
-        data = event.data or ""
-        page = 0
-        if data.startswith("tasks:page:"):
-            try:
-                page = int(data.split(":", 2)[2])
-            except ValueError:
-                page = 0
+        await answer_callback(event)
+        if cb is not None and cb.action == "page":
+            page = cb.args[0]
 
     await render_tasks_screen(event, user_id, page=page)
 
@@ -666,33 +570,31 @@ async def list_handler(event: Union[Message, CallbackQuery]):
 # --------- /add ---------
 
 @todo_router.message(Command("add"))
-@todo_router.callback_query(F.data == "cmd_add")
+@callbacks.route("cmd", "add")
 async def add_handler(event: Union[Message, CallbackQuery], state: FSMContext):
     """
     /add или кнопка /add -> переходим в состояние ожидания текста задачи.
     Аргументы после /add игнорируем, всегда ждём новое сообщение с текстом.
     """
     if isinstance(event, Message):
-        try:
-            await event.delete()  # убираем команду пользователя
-        except Exception:
-            pass
+        schedule_delete(event)
     else:
-        await event.answer()
+        await answer_callback(event)
 
     await state.set_state(TodoStates.add_text)
 
     await show_screen(
         event,
         "Создание новой задачи.\n"
-        "Отправь текст задачи одним сообщением.",
+        "Отправь текст задачи одним сообщением.\n"
+        "Срок можно дописать в конце: «Купить молоко завтра 9:00».",
         reply_markup=build_cancel_add_task_kb(),
     )
 
 
-@todo_router.callback_query(F.data == "cmd_add_cancel")
+@callbacks.route("cmd", "add_cancel")
 async def cb_add_cancel(query: CallbackQuery, state: FSMContext):
-    await query.answer()
+    await answer_callback(query)
     await state.clear()
     await render_tasks_screen(
         query,
@@ -706,10 +608,7 @@ async def cb_add_cancel(query: CallbackQuery, state: FSMContext):
 async def state_add_text(message: Message, state: FSMContext):
     text = message.text.strip()
     if not text:
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
         await show_screen(
             message,
             "Текст задачи не может быть пустым.\n"
@@ -718,16 +617,23 @@ async def state_add_text(message: Message, state: FSMContext):
         )
         return
 
-    task = await storage.add_task(message.from_user.id, text)
-    await state.clear()
+    user_id = message.from_user.id
+    off = int((await user_context.get_tz_offset(user_id)) or 0)
+    text, due = split_deadline(text, dt.datetime.now(dt.timezone.utc), off)
 
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    task = await storage.add_task(user_id, text)
+
+    schedule_delete(message)
+
+    if due is not None:
+        # срок указан прямо в тексте — пикер не нужен
+        await state.clear()
+        await _apply_due(message, task["id"], due.isoformat(), off)
+        return
 
-    # вместо списка сразу запускаем выбор дедлайна
-    await _dp_start_for_task(message, state, task)
+    # вместо списка сразу запускаем выбор дедлайна; срок можно и написать
+    await _await_due_text(state, task["id"])
+    await _dp_start_for_task(message, task)
 
 
 
@@ -735,10 +641,10 @@ async def state_add_text(message: Message, state: FSMContext):
 # --------- /done ---------
 
 @todo_router.message(Command("done"))
-@todo_router.callback_query(F.data == "cmd_done")
+@callbacks.route("cmd", "done")
 async def done_handler(event: Union[Message, CallbackQuery]):
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
         await event.message.answer(
             "Чтобы пометить задачу выполненной, отправь: /done ID"
         )
@@ -746,10 +652,7 @@ async def done_handler(event: Union[Message, CallbackQuery]):
 
     parts = event.text.split(maxsplit=1)
     if len(parts) < 2 or not parts[1].isdigit():
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
         await event.bot.send_message(
             chat_id=event.chat.id,
             text="Используй: /done id",
@@ -758,10 +661,7 @@ async def done_handler(event: Union[Message, CallbackQuery]):
 
     tid = int(parts[1])
     ok = await storage.mark_done(tid, event.from_user.id)
-    try:
-        await event.delete()
-    except Exception:
-        pass
+    schedule_delete(event)
 
     prefix = (
         f"Теперь задача считается выполненной."
@@ -774,10 +674,10 @@ async def done_handler(event: Union[Message, CallbackQuery]):
 # --------- /due ---------
 
 @todo_router.message(Command("due"))
-@todo_router.callback_query(F.data == "cmd_due")
+@callbacks.route("cmd", "due")
 async def due_handler(event: Union[Message, CallbackQuery]):
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
         await event.message.answer(
             "Чтобы установить дедлайн, отправь: /due ID YYYY-MM-DD HH:MM"
         )
@@ -785,10 +685,7 @@ async def due_handler(event: Union[Message, CallbackQuery]):
 
     parts = event.text.split(maxsplit=2)
     if len(parts) < 3:
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
         await event.bot.send_message(
             chat_id=event.chat.id,
             text="Используй: /due id YYYY-MM-DD HH:MM",
@@ -798,10 +695,7 @@ async def due_handler(event: Union[Message, CallbackQuery]):
     try:
         tid = int(parts[1])
     except ValueError:
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
         await event.bot.send_message(
             chat_id=event.chat.id,
             text="Неправильный id.",
@@ -811,10 +705,7 @@ async def due_handler(event: Union[Message, CallbackQuery]):
     try:
         due_dt = dt.datetime.strptime(parts[2], "%Y-%m-%d %H:%M")
     except Exception:
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
         await event.bot.send_message(
             chat_id=event.chat.id,
             text="Неправильный формат даты. Используй: YYYY-MM-DD HH:MM",
@@ -823,10 +714,7 @@ async def due_handler(event: Union[Message, CallbackQuery]):
 
     iso = due_dt.replace(second=0, microsecond=0).isoformat()
     ok = await storage.set_due(tid, event.from_user.id, iso)
-    try:
-        await event.delete()
-    except Exception:
-        pass
+    schedule_delete(event)
 
     prefix = (
         f"Дедлайн для #{tid} установлен: {iso}"
@@ -839,19 +727,16 @@ async def due_handler(event: Union[Message, CallbackQuery]):
 # --------- /delete ---------
 
 @todo_router.message(Command("delete"))
-@todo_router.callback_query(F.data == "cmd_delete")
+@callbacks.route("cmd", "delete")
 async def delete_handler(event: Union[Message, CallbackQuery]):
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        await answer_callback(event)
         await event.message.answer("Чтобы удалить задачу, отправь: /delete ID")
         return
 
     parts = event.text.split(maxsplit=1)
     if len(parts) < 2 or not parts[1].isdigit():
-        try:
-            await event.delete()
-        except Exception:
-            pass
+        schedule_delete(event)
         await event.bot.send_message(
             chat_id=event.chat.id,
             text="Используй: /delete id",
@@ -859,10 +744,7 @@ async def delete_handler(event: Union[Message, CallbackQuery]):
         return
 
     tid = int(parts[1])
-    try:
-        await event.delete()
-    except Exception:
-        pass
+    schedule_delete(event)
 
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -887,14 +769,10 @@ async def delete_handler(event: Union[Message, CallbackQuery]):
 
 # --------- карточка задачи ---------
 
-@todo_router.callback_query(F.data.startswith("task:show:"))
-async def cb_task_show(query: CallbackQuery):
-    await query.answer()
-    try:
-        tid = int(query.data.split(":", 2)[2])
-    except Exception:
-        await query.message.answer("Некорректный id задачи.")
-        return
+@callbacks.route("task", "show", int)
+async def cb_task_show(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     task = await storage.get_task(tid, query.from_user.id)
     if not task:
@@ -907,14 +785,10 @@ async def cb_task_show(query: CallbackQuery):
 
 # --------- edit text ---------
 
-@todo_router.callback_query(F.data.startswith("task:edit_text:"))
-async def cb_task_edit_text(query: CallbackQuery, state: FSMContext):
-    await query.answer()
-    try:
-        tid = int(query.data.split(":", 2)[2])
-    except Exception:
-        await query.message.answer("Некорректный id задачи.")
-        return
+@callbacks.route("task", "edit_text", int)
+async def cb_task_edit_text(query: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     await state.set_state(TodoStates.edit_text)
     await state.update_data(edit_tid=tid)
@@ -932,10 +806,7 @@ async def state_receive_new_text(message: Message, state: FSMContext):
     tid = data.get("edit_tid")
     if not tid:
         await state.clear()
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
         await message.bot.send_message(
             chat_id=message.chat.id,
             text="Контекст состояния потерян.",
@@ -944,10 +815,7 @@ async def state_receive_new_text(message: Message, state: FSMContext):
 
     new_text = message.text.strip()
     if not new_text:
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
         await message.bot.send_message(
             chat_id=message.chat.id,
             text="Текст не может быть пустым. Отправь новый текст.",
@@ -957,10 +825,7 @@ async def state_receive_new_text(message: Message, state: FSMContext):
     ok = await storage.update_task(tid, message.from_user.id, text=new_text)
     await state.clear()
 
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    schedule_delete(message)
 
     if ok:
         prefix = f"Задача #{tid} обновлена."
@@ -977,20 +842,51 @@ async def state_receive_new_text(message: Message, state: FSMContext):
 
 # --------- edit due ---------
 
-@todo_router.callback_query(F.data.startswith("task:edit_due:"))
-async def cb_task_edit_due(query: CallbackQuery, state: FSMContext):
-    try:
-        tid = int(query.data.split(":", 2)[2])
-    except Exception:
-        await query.answer("Некорректный id задачи.", show_alert=True)
-        return
+@callbacks.route("task", "edit_due", int)
+async def cb_task_edit_due(query: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     task = await storage.get_task(tid, query.from_user.id)
     if not task:
-        await query.answer("Задача не найдена.", show_alert=True)
+        await render_tasks_screen(
+            query, query.from_user.id, page=0, prefix="Задача не найдена."
+        )
         return
 
-    await _dp_start_for_task(query, state, task)
+    await _await_due_text(state, tid)
+    await _dp_start_for_task(query, task)
+
+
+async def _await_due_text(state: FSMContext, tid: int) -> None:
+    """
+    Пока открыт пикер, срок для задачи tid можно прислать текстом.
+    """
+    await state.set_state(TodoStates.edit_due)
+    await state.set_data({"edit_tid": tid})
+
+
+async def _apply_due(
+    event: Union[Message, CallbackQuery],
+    tid: int,
+    due_iso: str,
+    off: int,
+) -> None:
+    """
+    Сохранить дедлайн (UTC ISO) и показать карточку задачи.
+    """
+    user_id = event.from_user.id
+    ok = await storage.set_due(tid, user_id, due_iso)
+
+    if ok:
+        task = await storage.get_task(tid, user_id)
+        if task:
+            prefix = f"Дедлайн установлен: {_utc_iso_to_local_str(task.get('due_at'), off)}"
+            await render_task_card(event, task, prefix=prefix)
+            return
+        await show_screen(event, "Дедлайн сохранён, но задача не найдена.")
+    else:
+        await show_screen(event, "Не удалось сохранить дедлайн.")
 
 
 
@@ -998,66 +894,62 @@ async def cb_task_edit_due(query: CallbackQuery, state: FSMContext):
 async def state_receive_new_due(message: Message, state: FSMContext):
     data = await state.get_data()
     tid = data.get("edit_tid")
+    schedule_delete(message)
     if not tid:
         await state.clear()
-        try:
-            await message.delete()
-        except Exception:
-            pass
-        await message.bot.send_message(
-            chat_id=message.chat.id,
-            text="Контекст состояния потерян.",
-        )
+        await render_tasks_screen(message, message.from_user.id, prefix="Контекст состояния потерян.")
         return
 
-    try:
-        due_dt = dt.datetime.strptime(
-            message.text.strip(), "%Y-%m-%d %H:%M"
-        )
-    except Exception:
-        try:
-            await message.delete()
-        except Exception:
-            pass
-        await message.bot.send_message(
-            chat_id=message.chat.id,
-            text="Неправильный формат. Используй: YYYY-MM-DD HH:MM",
+    off = int((await user_context.get_tz_offset(message.from_user.id)) or 0)
+    now = dt.datetime.now(dt.timezone.utc)
+    due = parse_deadline(message.text or "", now, off)
+
+    if due is not None and due <= now:
+        await _show_past_due(message, int(tid), due, off)
+        return
+    if due is None:
+        # ответ — на экране бота, а не новым сообщением в чате
+        await show_screen(
+            message,
+            "Не понял срок. Примеры: «завтра 9:00», «через 2 часа», "
+            "«пт 18:00», «01.11 14:30», «2026-11-01 14:30».\n"
+            "Отправь срок ещё раз или выбери дату кнопками.",
+            reply_markup=_due_retry_kb(int(tid)),
         )
         return
 
-    iso = due_dt.replace(second=0, microsecond=0).isoformat()
-    ok = await storage.set_due(tid, message.from_user.id, iso)
     await state.clear()
+    await _apply_due(message, int(tid), due.isoformat(), off)
 
-    try:
-        await message.delete()
-    except Exception:
-        pass
 
-    if ok:
-        prefix = f"Дедлайн для #{tid} установлен: {iso}"
-        task = await storage.get_task(tid, message.from_user.id)
-        if task:
-            await render_task_card(message, task, prefix=prefix)
-            return
+async def _show_past_due(message: Message, tid: int, due: dt.datetime, off: int) -> None:
+    # напоминание о прошедшем сроке нотифаер уже не отправит — не сохраняем
+    await show_screen(
+        message,
+        f"Срок {_utc_iso_to_local_str(due.isoformat(), off)} уже прошёл.\n"
+        "Отправь срок в будущем или выбери дату кнопками.",
+        reply_markup=_due_retry_kb(tid),
+    )
 
-    await message.bot.send_message(
-        chat_id=message.chat.id,
-        text="Задача не найдена или не относится к вам.",
+
+def _due_retry_kb(tid: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="Выбрать дату", callback_data=f"task:edit_due:{tid}"),
+                InlineKeyboardButton(text="⬅️ К задаче", callback_data=f"task:show:{tid}"),
+            ]
+        ]
     )
 
 
 
 # --------- mark done из карточки ---------
 
-@todo_router.callback_query(F.data.startswith("task:mark_done:"))
-async def cb_task_mark_done(query: CallbackQuery):
-    await query.answer()
-    try:
-        tid = int(query.data.split(":", 2)[2])
-    except Exception:
-        await query.message.answer("Некорректный id задачи.")
-        return
+@callbacks.route("task", "mark_done", int)
+async def cb_task_mark_done(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     ok = await storage.mark_done(tid, query.from_user.id)
     if ok:
@@ -1071,14 +963,10 @@ async def cb_task_mark_done(query: CallbackQuery):
 
 # --------- delete из карточки ---------
 
-@todo_router.callback_query(F.data.startswith("task:confirm_delete:"))
-async def cb_task_confirm_delete(query: CallbackQuery):
-    await query.answer()
-    try:
-        tid = int((query.data or "").split(":", 2)[2])
-    except Exception:
-        await show_screen(query, "Некорректный id задачи.")
-        return
+@callbacks.route("task", "confirm_delete", int)
+async def cb_task_confirm_delete(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     # считаем «человеческий» номер задачи в текущем списке
     tasks = await storage.list_user_tasks(query.from_user.id)
@@ -1116,14 +1004,10 @@ async def cb_task_confirm_delete(query: CallbackQuery):
 
 
 
-@todo_router.callback_query(F.data.startswith("task:do_delete:"))
-async def cb_task_do_delete(query: CallbackQuery):
-    await query.answer()
-    try:
-        tid = int((query.data or "").split(":", 2)[2])
-    except Exception:
-        await show_screen(query, "Некорректный id задачи.")
-        return
+@callbacks.route("task", "do_delete", int)
+async def cb_task_do_delete(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    tid = cb.args[0]
 
     user_id = query.from_user.id
     chat_id = query.message.chat.id
@@ -1155,11 +1039,7 @@ async def cb_task_do_delete(query: CallbackQuery):
     )
 
     # 2) очищаем ui_state, чтобы следующий экран был НОВЫМ сообщением
-    try:
-        await storage.delete_ui_message_id(chat_id=chat_id, user_id=user_id)
-    except Exception:
-        # если не получилось — не критично, просто останется старый id
-        pass
+    ui_cache.forget(chat_id=chat_id, user_id=user_id)
 
     # 3) показываем список задач, его message_id сохранится как актуальный экран
     await render_tasks_screen(
@@ -1170,57 +1050,118 @@ async def cb_task_do_delete(query: CallbackQuery):
 
 
 
-@todo_router.callback_query(F.data == "task:cancel")
+@callbacks.route("task", "cancel")
 async def cb_cancel(query: CallbackQuery, state: FSMContext):
-    await query.answer()
+    await answer_callback(query)
     await state.clear()
     await render_tasks_screen(query, query.from_user.id, prefix="Отменено.")
 
 
 # --------- режим удаления списка ---------
 
-@todo_router.callback_query(F.data == "tasks:delete_mode")
+# выбор в режиме удаления живёт в памяти процесса, в FSM не пишется:
+# каждое нажатие — без записи в БД. Потеря при рестарте или на другой
+# реплике не страшна — выбор текущей страницы восстанавливается по
+# отметкам на клавиатуре.
+DEL_SELECTION_MAX = 10_000
+_del_selection: "OrderedDict[int, set[int]]" = OrderedDict()
+
+
+def _del_selected(query: CallbackQuery) -> set[int]:
+    selected = _del_selection.get(query.from_user.id)
+    if selected is None:
+        selected = selected_from_keyboard(getattr(query.message, "reply_markup", None))
+    return set(selected)
+
+
+def _del_remember(user_id: int, selected: set[int]) -> None:
+    _del_selection[user_id] = selected
+    _del_selection.move_to_end(user_id)
+    while len(_del_selection) > DEL_SELECTION_MAX:
+        _del_selection.popitem(last=False)
+
+
+@callbacks.route("tasks", "delete_mode")
 async def cb_tasks_delete_mode(query: CallbackQuery):
-    await query.answer()
+    await answer_callback(query)
+    # каждый вход в режим — с пустым выбором
+    selected: set[int] = set()
+    _del_remember(query.from_user.id, selected)
+    await _render_delete_mode(query, selected, page=0)
+
+
+@callbacks.route("del", "page", int)
+async def cb_del_page(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    selected = _del_selected(query)
+    _del_remember(query.from_user.id, selected)
+    await _render_delete_mode(query, selected, page=cb.args[0])
+
+
+@callbacks.route("del", "toggle", int, int)
+async def cb_del_toggle(query: CallbackQuery, cb: CallbackData):
+    await answer_callback(query)
+    tid, page = cb.args
+    selected = _del_selected(query)
+    if tid in selected:
+        selected.discard(tid)
+    else:
+        selected.add(tid)
+    _del_remember(query.from_user.id, selected)
+    await _render_delete_mode(query, selected, page=page)
+
+
+@callbacks.route("del", "apply")
+async def cb_del_apply(query: CallbackQuery):
+    selected = _del_selected(query)
+    if not selected:
+        await answer_callback(query, "Ничего не выбрано.")
+        return
+
+    await answer_callback(query)
+    deleted = await storage.delete_tasks(query.from_user.id, sorted(selected))
+    _del_selection.pop(query.from_user.id, None)
+    await render_tasks_screen(
+        query,
+        query.from_user.id,
+        page=0,
+        prefix=f"Удалено задач: {deleted}.",
+    )
+
+
+async def _render_delete_mode(
+    query: CallbackQuery,
+    selected: set[int],
+    page: int,
+) -> None:
+    await answer_callback(query)
     tasks = await storage.list_user_tasks(query.from_user.id)
     if not tasks:
-        await query.message.answer("У вас нет задач.")
+        await render_tasks_screen(query, query.from_user.id, page=0)
         return
 
     tasks_sorted = sorted(
         tasks, key=lambda t: (t.get("is_done", 0), t.get("id", 0)),
     )
-    rows: List[List[InlineKeyboardButton]] = []
-    for idx, t in enumerate(tasks_sorted, start=1):
-        tid = t.get("id")
-        text = t.get("text", "")
-        label = f"{idx}. {text[:40]}"
-        rows.append(
-            [
-                InlineKeyboardButton(
-                    text=label,
-                    callback_data=f"task:confirm_delete:{tid}",
-                )
-            ]
-        )
+    total_pages = (len(tasks_sorted) + DELETE_PER_PAGE - 1) // DELETE_PER_PAGE
+    page = max(0, min(page, total_pages - 1))
 
+    # выбор мог устареть (задачу удалили в другом месте)
+    selected &= {t["id"] for t in tasks_sorted}
 
-    rows.append(
-        [InlineKeyboardButton(text="Назад к списку", callback_data="cmd_list")]
-    )
-    kb = InlineKeyboardMarkup(inline_keyboard=rows)
     await show_screen(
         query,
-        "Режим удаления: выбери задачу для удаления.",
-        reply_markup=kb,
+        "Режим удаления: отметь задачи и нажми «Удалить выбранные».\n"
+        f"Выбрано: {len(selected)}. Страница {page + 1}/{total_pages}.",
+        reply_markup=delete_mode_keyboard(tasks_sorted, selected, page),
     )
 
 
 # --------- postpone ---------
 
-@todo_router.callback_query(F.data == "tasks:postpone_prompt")
+@callbacks.route("tasks", "postpone_prompt")
 async def cb_postpone_prompt(query: CallbackQuery, state: FSMContext):
-    await query.answer()
+    await answer_callback(query)
     await state.set_state(TodoStates.postpone_wait_date)
     await show_screen(
         query,
@@ -1236,10 +1177,7 @@ async def state_receive_postpone_date(message: Message, state: FSMContext):
             message.text.strip(), "%Y-%m-%d %H:%M"
         )
     except Exception:
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
         await message.bot.send_message(
             chat_id=message.chat.id,
             text="Неправильный формат. Используй YYYY-MM-DD HH:MM",
@@ -1262,10 +1200,7 @@ async def state_receive_postpone_date(message: Message, state: FSMContext):
             count += 1
 
     await state.clear()
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    schedule_delete(message)
 
     await render_tasks_screen(
         message,
@@ -1276,120 +1211,88 @@ async def state_receive_postpone_date(message: Message, state: FSMContext):
 
 # --------- noop ---------
 
-@todo_router.callback_query(F.data == "noop")
+@callbacks.route("noop", "")
 async def cb_noop(query: CallbackQuery):
-    await query.answer()
+    await answer_callback(query)
 
 # ------- CALENDAR ---------
 
-@todo_router.callback_query(
-    StateFilter(DatePickerState.picking),
-    F.data.startswith("dp:")
-)
-async def dp_callback(query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    parts = (query.data or "").split(":")
-
-    if len(parts) < 2:
-        try:
-            await query.answer()
-        except Exception:
-            pass
-        return
+_DP_VALUE_OPS = {
+    "d": "День выбран.",
+    "m": "Месяц выбран.",
+    "h": "Час выбран.",
+    "i": "Минуты выбраны.",
+}
 
-    kind = parts[1]
 
-    # выбор значения: день/месяц/час/минуты
-    if kind == "set" and len(parts) == 4:
-        field = parts[2]
-        try:
-            value = int(parts[3])
-        except ValueError:
-            await query.answer("Некорректное значение.", show_alert=True)
-            return
+@callbacks.route("dp", None, int, _dp_unpack, _dp_stage)
+async def dp_callback(
+    query: CallbackQuery,
+    state: FSMContext,
+    cb: CallbackData,
+    raw_state: Optional[str] = None,
+):
+    """
+    Пикер без FSM: из callback_data берём задачу, дату и шаг,
+    рисуем экран. В хранилище состояний ходим только на шаге 'год'
+    (ждём текст) и при выходе из него.
+    """
+    op = cb.action
+    tid, (year, month, day, hour, minute), stage = cb.args
 
-        if field == "day":
-            data["dp_day"] = value
-            msg = "День выбран."
-        elif field == "month":
-            data["dp_month"] = value
-            msg = "Месяц выбран."
-        elif field == "hour":
-            data["dp_hour"] = value
-            msg = "Час выбран."
-        elif field == "minute":
-            data["dp_minute"] = value
-            msg = "Минуты выбраны."
-        else:
-            await query.answer("Неизвестное поле.", show_alert=True)
-            return
+    in_year_input = raw_state == DatePickerState.picking.state
+    awaiting_text = in_year_input or raw_state == TodoStates.edit_due.state
 
-        await state.set_data(data)
-        await query.answer(msg)
-        await _dp_show_screen(query, state)
+    # выбор значения: день/месяц/час/минуты
+    if op in _DP_VALUE_OPS:
+        await answer_callback(query, _DP_VALUE_OPS[op])
+        await _dp_show_screen(query, tid, stage, year, month, day, hour, minute)
         return
 
     # смена шага: day/month/hour/minute/year
-    if kind == "stage" and len(parts) == 3:
-        target = parts[2]
-        if target not in {"day", "month", "hour", "minute", "year"}:
-            await query.answer("Неизвестный шаг.", show_alert=True)
-            return
-
-        data["dp_stage"] = target
-        await state.set_data(data)
-        await query.answer(f"Шаг: {_dp_stage_label(target)}")
-        await _dp_show_screen(query, state)
+    if op == "s":
+        await answer_callback(query, f"Шаг: {_dp_stage_label(stage)}")
+        if stage == "year":
+            # год вводится текстом — запоминаем, к какому пикеру он относится
+            await state.set_state(DatePickerState.picking)
+            await state.set_data(
+                {"dp_task_id": tid, "dp_packed": _dp_pack(year, month, day, hour, minute)}
+            )
+        elif in_year_input:
+            # с шага 'год' ушли кнопкой — снова принимаем срок текстом
+            await _await_due_text(state, tid)
+        await _dp_show_screen(query, tid, stage, year, month, day, hour, minute)
         return
 
     # сохранение результата для задачи чтобы можно было сохранить дедлайн и выйти из пикера
-    if kind == "save":
-        mode = data.get("dp_mode")
-        if mode != "due":
-            await state.clear()
-            await query.answer("Контекст выбора даты потерян.", show_alert=True)
-            await show_screen(query, "Контекст выбора даты потерян.")
-            return
-
-        task_id = data.get("dp_task_id")
-        if not isinstance(task_id, int):
+    if op == "save":
+        # отвечаем сразу, результат будет на экране
+        await answer_callback(query)
+        if awaiting_text:
             await state.clear()
-            await query.answer("Контекст задачи потерян.", show_alert=True)
-            await show_screen(query, "Контекст задачи потерян.")
-            return
-
-        # ЛОКАЛЬ (компоненты в FSM) -> UTC ISO
-        off = int((await get_user_tz_offset(query.from_user.id)) or 0)
-        due_iso = _dp_state_to_utc_iso(data, off)
-
-        ok = await storage.set_due(task_id, query.from_user.id, due_iso)
-        await state.clear()
-
-        if ok:
-            task = await storage.get_task(task_id, query.from_user.id)
-            await query.answer("Дедлайн сохранён.")
-            if task:
-                prefix = f"Дедлайн установлен: {_utc_iso_to_local_str(task.get('due_at'), off)}"
-                await render_task_card(query, task, prefix=prefix)
-                return
-            await show_screen(query, "Дедлайн сохранён, но задача не найдена.")
-        else:
-            await query.answer("Не удалось сохранить дедлайн.", show_alert=True)
-            await show_screen(query, "Не удалось сохранить дедлайн.")
 
+        # ЛОКАЛЬ (компоненты из callback_data) -> UTC ISO
+        off = int((await user_context.get_tz_offset(query.from_user.id)) or 0)
+        due_iso = _dp_local_to_utc_iso(year, month, day, hour, minute, off)
+        await _apply_due(query, tid, due_iso, off)
         return
 
-    await query.answer("Неизвестное действие.", show_alert=True)
+    await answer_callback(query, "Неизвестное действие.", show_alert=True)
 
 
-def _dp_state_to_utc_iso(data: dict, off_minutes: int) -> str:
+def _dp_local_to_utc_iso(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    off_minutes: int,
+) -> str:
     """
-    ЛОКАЛЬ (компоненты из FSM) -> UTC ISO.
+    ЛОКАЛЬ (компоненты пикера) -> UTC ISO.
     Формула: UTC = local + offset (offset = server - user).
     """
-    y = int(data["dp_year"]); m = int(data["dp_month"]); d = int(data["dp_day"])
-    hh = int(data["dp_hour"]); mm = int(data["dp_minute"])
-    local = dt.datetime(y, m, d, hh, mm)
+    local = dt.datetime(year, month, day, hour, minute)
     utc_naive = local + dt.timedelta(minutes=int(off_minutes or 0))
     return utc_naive.replace(tzinfo=dt.timezone.utc, second=0, microsecond=0).isoformat()
 
@@ -1416,26 +1319,32 @@ def _utc_iso_to_local_str(iso_str: Optional[str], off_minutes: int) -> str:
 
 @todo_router.message(StateFilter(DatePickerState.picking))
 async def dp_year_input(message: Message, state: FSMContext):
+    # в это состояние попадаем только с шага 'year'
     data = await state.get_data()
-    stage = data.get("dp_stage")
-
-    # Разрешаем текст только на шаге 'year'
-    if stage != "year":
-        # Любые чужие сообщения в этом состоянии просто удаляем
-        try:
-            await message.delete()
-        except Exception:
-            pass
+    try:
+        tid = int(data["dp_task_id"])
+        _, month, day, hour, minute = _dp_unpack(data["dp_packed"])
+    except (KeyError, TypeError, ValueError):
+        await state.clear()
+        schedule_delete(message)
         return
 
     text = (message.text or "").strip()
     try:
         year = int(text)
     except ValueError:
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
+        # не год — может, сразу срок целиком
+        off = int((await user_context.get_tz_offset(message.from_user.id)) or 0)
+        now = dt.datetime.now(dt.timezone.utc)
+        due = parse_deadline(text, now, off)
+        if due is not None and due <= now:
+            await _show_past_due(message, tid, due, off)
+            return
+        if due is not None:
+            await state.clear()
+            await _apply_due(message, tid, due.isoformat(), off)
+            return
         await show_screen(
             message,
             "Год должен быть числом, например: 2025.\n"
@@ -1444,10 +1353,7 @@ async def dp_year_input(message: Message, state: FSMContext):
         return
 
     if year < 1970 or year > 2100:
-        try:
-            await message.delete()
-        except Exception:
-            pass
+        schedule_delete(message)
         await show_screen(
             message,
             "Год должен быть в диапазоне 1970–2100.\n"
@@ -1455,24 +1361,15 @@ async def dp_year_input(message: Message, state: FSMContext):
         )
         return
 
-    data["dp_year"] = year
-    # после ввода года логично вернуться к дням
-    data["dp_stage"] = "day"
-    await state.set_data(data)
+    await _await_due_text(state, tid)
+    schedule_delete(message)
 
-    try:
-        await message.delete()
-    except Exception:
-        pass
-
-    await _dp_show_screen(message, state)
+    # после ввода года логично вернуться к дням
+    await _dp_show_screen(message, tid, "day", year, month, day, hour, minute)
 
 
 # --------- catch-all: удалять любой текст ---------
 
 @todo_router.message()
 async def trash_any_text(message: Message):
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    schedule_delete(message)
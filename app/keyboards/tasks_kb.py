@@ -1,9 +1,10 @@
 # app/keyboards/tasks_kb.py
-from typing import List, Dict, Optional
+from typing import Collection, List, Dict, Optional, Set
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 
 DEFAULT_PER_PAGE = 5
+DELETE_PER_PAGE = 8
 
 
 def tasks_page_keyboard(
@@ -115,3 +116,99 @@ def tasks_page_keyboard(
     )
 
     return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def delete_mode_keyboard(
+    tasks_sorted: List[Dict],
+    selected: Collection[int],
+    page: int,
+    per_page: int = DELETE_PER_PAGE,
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура режима удаления:
+    - по странице задач с чекбоксами (del:toggle:<id>:<page>);
+    - навигация по страницам (del:page:<n>);
+    - "Удалить выбранные" (del:apply) и выход к списку.
+    На странице не больше per_page задач — лимиты Telegram
+    на размер клавиатуры не зависят от длины списка.
+    """
+    total = len(tasks_sorted)
+    if per_page <= 0:
+        per_page = DELETE_PER_PAGE
+
+    start_index = page * per_page
+    end_index = min(start_index + per_page, total)
+
+    rows: List[List[InlineKeyboardButton]] = []
+
+    for visible_index, task in enumerate(
+        tasks_sorted[start_index:end_index],
+        start=start_index + 1,
+    ):
+        tid = task.get("id")
+        text = task.get("text", "") or ""
+        box = "☑️" if tid in selected else "⬜️"
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=f"{box} {visible_index}. {text[:40]}",
+                    callback_data=f"del:toggle:{tid}:{page}",
+                )
+            ]
+        )
+
+    nav_row: List[InlineKeyboardButton] = []
+    if page > 0:
+        nav_row.append(
+            InlineKeyboardButton(
+                text="⬅️ Назад",
+                callback_data=f"del:page:{page - 1}",
+            )
+        )
+    if end_index < total:
+        nav_row.append(
+            InlineKeyboardButton(
+                text="Вперёд ➡️",
+                callback_data=f"del:page:{page + 1}",
+            )
+        )
+    if nav_row:
+        rows.append(nav_row)
+
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text=f"Удалить выбранные ❌ ({len(selected)})",
+                callback_data="del:apply",
+            )
+        ]
+    )
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text="Назад к списку",
+                callback_data="cmd_list",
+            )
+        ]
+    )
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def selected_from_keyboard(markup: Optional[InlineKeyboardMarkup]) -> Set[int]:
+    """
+    Отмеченные задачи на клавиатуре delete_mode_keyboard
+    (видна только текущая страница).
+    """
+    selected: Set[int] = set()
+    if markup is None:
+        return selected
+    for row in markup.inline_keyboard:
+        for button in row:
+            data = button.callback_data or ""
+            if data.startswith("del:toggle:") and button.text.startswith("☑️"):
+                try:
+                    selected.add(int(data.split(":")[2]))
+                except (IndexError, ValueError):
+                    continue
+    return selected
@@ -0,0 +1,22 @@
+# init-файл пакета middlewares
+from .lanes import UserLaneMiddleware
+from .outbound import OutboundSchedulerMiddleware
+from .picker_exit import PickerExitMiddleware
+from .throttling import ThrottlingMiddleware
+from .update_context import (
+    UpdateContextMiddleware,
+    ApiCallCounterMiddleware,
+    HandlerNameMiddleware,
+)
+from .user_context import UserContextMiddleware
+
+__all__ = [
+    "ThrottlingMiddleware",
+    "UserLaneMiddleware",
+    "UpdateContextMiddleware",
+    "ApiCallCounterMiddleware",
+    "HandlerNameMiddleware",
+    "UserContextMiddleware",
+    "OutboundSchedulerMiddleware",
+    "PickerExitMiddleware",
+]
@@ -0,0 +1,92 @@
+# app/middlewares/lanes.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.utils.metrics import Gauge, Histogram
+
+DEFAULT_LANES = 1024
+DEFAULT_MAX_IN_FLIGHT = 8
+
+IN_FLIGHT = Gauge(
+    "updates_in_flight",
+    "Апдейты, которые сейчас обрабатываются хендлерами",
+)
+QUEUED = Gauge(
+    "updates_queued",
+    "Апдейты, ждущие свою очередь пользователя или общий лимит",
+)
+WAIT_SECONDS = Histogram(
+    "update_lane_wait_seconds",
+    "Ожидание апдейта перед хендлером (очередь пользователя + общий лимит)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class UserLaneMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на update: апдейты одного пользователя обрабатываются
+    строго по очереди, разных — параллельно.
+
+    - очередь пользователя — один из `lanes` asyncio.Lock (user_id % lanes):
+      памяти O(lanes), а не O(пользователей); Lock честный (FIFO), поэтому
+      порядок апдейтов пользователя сохраняется;
+    - общий лимит `max_in_flight` одновременно работающих хендлеров
+      (Semaphore) берётся уже после своей очереди, так что очередь одного
+      шумного пользователя не занимает слоты остальных.
+
+    Ставить раньше middleware, которые ходят в БД/сеть до хендлера,
+    в том числе раньше FSM-middleware aiogram (Dispatcher с
+    disable_fsm=True, dp.fsm регистрируется после очереди): иначе
+    апдейт маршрутизируется по состоянию до обработки предыдущего.
+
+    Принятые апдейты для остановки считает UpdateContextMiddleware —
+    он стоит первым и видит апдейты ещё до троттлинга и очереди.
+    """
+
+    def __init__(
+        self,
+        lanes: int = DEFAULT_LANES,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ):
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(max(1, lanes))]
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._in_flight = 0
+
+    def _lane(self, data: Dict[str, Any]) -> asyncio.Lock:
+        user = data.get("event_from_user")
+        if user is not None:
+            key = user.id
+        else:
+            chat = data.get("event_chat")
+            key = chat.id if chat is not None else 0
+        return self._locks[key % len(self._locks)]
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        QUEUED.inc()
+        queued = True
+        started = time.perf_counter()
+        try:
+            async with self._lane(data):
+                async with self._slots:
+                    QUEUED.dec()
+                    queued = False
+                    WAIT_SECONDS.observe(time.perf_counter() - started)
+                    self._in_flight += 1
+                    IN_FLIGHT.set(self._in_flight)
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self._in_flight -= 1
+                        IN_FLIGHT.set(self._in_flight)
+        finally:
+            if queued:
+                QUEUED.dec()
@@ -0,0 +1,279 @@
+# app/middlewares/outbound.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import DeleteMessage, DeleteMessages, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from app.utils.metrics import Counter, Gauge, Histogram
+from app.utils.update_context import current_stats
+
+logger = logging.getLogger(__name__)
+
+# классы приоритета, меньше — важнее
+INTERACTIVE = 0  # вызовы из хендлеров: экраны, ответы пользователю
+NOTIFICATION = 1  # напоминания и сводки нотифаера
+CLEANUP = 2  # удаление сообщений
+PRIORITY_NAMES = ("interactive", "notification", "cleanup")
+
+# сколько чатов держим в памяти, прежде чем выкинуть полные вёдра
+MAX_CHATS = 50_000
+
+QUEUED = Gauge(
+    "bot_api_queued",
+    "Вызовы Bot API, ждущие своей очереди в планировщике",
+    labelnames=("priority",),
+)
+QUEUE_WAIT = Histogram(
+    "bot_api_queue_wait_seconds",
+    "Ожидание вызова Bot API в планировщике",
+    labelnames=("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+RETRY_AFTER = Counter(
+    "bot_api_retry_after_total",
+    "Ответы 429 (Too Many Requests) от Bot API",
+    labelnames=("priority",),
+)
+
+
+def _priority(method: TelegramMethod) -> int:
+    if isinstance(method, (DeleteMessage, DeleteMessages)):
+        return CLEANUP
+    # внутри апдейта — ответ пользователю, вне — фоновая рассылка
+    return INTERACTIVE if current_stats() is not None else NOTIFICATION
+
+
+class _Bucket:
+    """
+    Token bucket: rate токенов в секунду, не больше burst;
+    paused_until — пауза после 429.
+    """
+
+    __slots__ = ("tokens", "last", "paused_until")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.last = now
+        self.paused_until = 0.0
+
+    def delay(self, rate: float, burst: float, now: float) -> float:
+        """
+        Через сколько секунд можно будет взять токен (0 — можно сейчас).
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(burst, self.tokens + (now - self.last) * rate)
+        self.last = now
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / rate
+
+    def pause(self, until: float) -> None:
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 0.0
+
+
+class _Waiter:
+    __slots__ = ("chat_id", "future", "queued_at")
+
+    def __init__(self, chat_id: Any, future: asyncio.Future, queued_at: float):
+        self.chat_id = chat_id
+        self.future = future
+        self.queued_at = queued_at
+
+
+class OutboundSchedulerMiddleware(BaseRequestMiddleware):
+    """
+    Сессионный middleware Bot: все вызовы, адресованные чату (есть chat_id),
+    проходят через общий планировщик.
+
+    - общий бюджет global_rate вызовов в секунду на процесс (лимит Telegram
+      ~30 сообщений/с на бота);
+    - бюджет chat_rate на чат (с запасом chat_burst) для фоновых вызовов —
+      напоминания и удаления в один чат не идут пачкой; интерактивные
+      вызовы его расходуют, но не ждут: их темп уже задаёт троттлинг
+      апдейтов (THROTTLE_CALLBACK_*), а ожидание внутри хендлера держало
+      бы слот UPDATE_MAX_IN_FLIGHT;
+    - очередь с приоритетами: interactive, затем notification, затем
+      cleanup; занятый чат не задерживает вызовы в другие чаты;
+    - на 429 (TelegramRetryAfter) чат ставится на паузу retry_after секунд,
+      ошибка уходит вызывающему, как и раньше.
+
+    Вызовы без chat_id (getUpdates, answerCallbackQuery, setWebhook…)
+    идут мимо планировщика. Один экземпляр вешается на сессии всех Bot
+    процесса (интерактивную и нотифаера), иначе общий учёт теряет смысл.
+    rate = 0 выключает соответствующее ограничение.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        global_burst: int = 30,
+        chat_rate: float = 3.0,
+        chat_burst: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.global_rate = global_rate
+        self.global_burst = float(max(1, global_burst))
+        self.chat_rate = chat_rate
+        self.chat_burst = float(max(1, chat_burst))
+        self._clock = clock
+
+        self._global = _Bucket(self.global_burst, clock())
+        self._chats: Dict[Any, _Bucket] = {}
+        self._queues: Tuple[Deque[_Waiter], ...] = tuple(deque() for _ in PRIORITY_NAMES)
+        self._wake = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        priority = _priority(method)
+        await self._acquire(priority, chat_id)
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as exc:
+            RETRY_AFTER.inc(priority=PRIORITY_NAMES[priority])
+            logger.warning(
+                "Bot API 429: chat=%s, %s, пауза %sс",
+                chat_id,
+                type(method).__name__,
+                exc.retry_after,
+            )
+            now = self._clock()
+            self._chat(chat_id, now).pause(now + exc.retry_after)
+            raise
+
+    # ---------- бюджеты ----------
+
+    def _chat(self, chat_id: Any, now: float) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHATS:
+                self._prune(now)
+            bucket = self._chats[chat_id] = _Bucket(self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        # ведро, которое успело наполниться и не на паузе, ничем не отличается от нового
+        full_after = self.chat_burst / self.chat_rate if self.chat_rate > 0 else 0.0
+        self._chats = {
+            chat_id: b
+            for chat_id, b in self._chats.items()
+            if now - b.last < full_after or now < b.paused_until
+        }
+
+    def _delay(self, priority: int, chat_id: Any, now: float) -> float:
+        """
+        Через сколько секунд вызов в chat_id укладывается в бюджеты.
+        """
+        delay = 0.0
+        if self.global_rate > 0:
+            delay = self._global.delay(self.global_rate, self.global_burst, now)
+        chat = self._chat(chat_id, now)
+        chat_delay = 0.0
+        if self.chat_rate > 0:
+            chat_delay = chat.delay(self.chat_rate, self.chat_burst, now)
+        if priority == INTERACTIVE or self.chat_rate <= 0:
+            # без бюджета чата — только пауза после 429
+            chat_delay = max(0.0, chat.paused_until - now)
+        return max(delay, chat_delay)
+
+    def _take(self, chat_id: Any) -> None:
+        if self.global_rate > 0:
+            self._global.tokens -= 1.0
+        if self.chat_rate > 0:
+            # интерактив может прийти при пустом ведре — в минус не уходим
+            bucket = self._chats[chat_id]
+            bucket.tokens = max(0.0, bucket.tokens - 1.0)
+
+    # ---------- очередь ----------
+
+    async def _acquire(self, priority: int, chat_id: Any) -> None:
+        now = self._clock()
+        name = PRIORITY_NAMES[priority]
+        # очередь пуста и бюджет есть — без ожидания
+        if not any(self._queues[: priority + 1]) and self._delay(priority, chat_id, now) == 0.0:
+            self._take(chat_id)
+            QUEUE_WAIT.observe(0.0, priority=name)
+            return
+
+        waiter = _Waiter(chat_id, asyncio.get_running_loop().create_future(), now)
+        self._queues[priority].append(waiter)
+        QUEUED.inc(priority=name)
+        self._wake.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        try:
+            await waiter.future
+        finally:
+            # при отмене вызова future отменяется, насос его пропустит
+            waiter.future.cancel()
+            QUEUED.dec(priority=name)
+        QUEUE_WAIT.observe(self._clock() - waiter.queued_at, priority=name)
+
+    def _release(self, now: float) -> float:
+        """
+        Пропустить один вызов: самый приоритетный, чей чат не занят.
+        Возвращает 0.0, если пропустили, иначе — сколько ждать.
+        """
+        wait = float("inf")
+        for priority, queue in enumerate(self._queues):
+            stale: List[_Waiter] = []
+            for waiter in queue:
+                if waiter.future.done():
+                    stale.append(waiter)
+                    continue
+                delay = self._delay(priority, waiter.chat_id, now)
+                if delay == 0.0:
+                    queue.remove(waiter)
+                    self._take(waiter.chat_id)
+                    waiter.future.set_result(None)
+                    wait = 0.0
+                    break
+                wait = min(wait, delay)
+            for waiter in stale:
+                if waiter in queue:
+                    queue.remove(waiter)
+            if wait == 0.0:
+                return 0.0
+        return wait
+
+    async def _pump(self) -> None:
+        try:
+            while any(self._queues):
+                wait = self._release(self._clock())
+                if wait == 0.0:
+                    continue
+                if wait == float("inf"):
+                    # в очереди остались только отменённые вызовы
+                    continue
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except Exception:
+            logger.exception("Outbound: ошибка планировщика, очередь отпущена")
+            for queue in self._queues:
+                while queue:
+                    waiter = queue.popleft()
+                    if not waiter.future.done():
+                        waiter.future.set_result(None)
@@ -0,0 +1,39 @@
+# app/middlewares/picker_exit.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from app.states.date_picker import DatePickerState
+from app.states.todo_states import TodoStates
+
+# состояния, живые только пока на экране пикер дедлайна
+_PICKER_STATES = (TodoStates.edit_due.state, DatePickerState.picking.state)
+
+
+class PickerExitMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на message/callback_query диспетчера: пикер дедлайна
+    ждёт срок текстом (TodoStates.edit_due / DatePickerState.picking).
+    Ушли с пикера — кнопкой не из пикера или командой — состояние
+    сбрасывается, иначе следующий обычный текст ушёл бы в разбор срока.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if data.get("raw_state") in _PICKER_STATES and _leaves_picker(event):
+            await data["state"].clear()
+            data["raw_state"] = None
+        return await handler(event, data)
+
+
+def _leaves_picker(event: TelegramObject) -> bool:
+    if isinstance(event, CallbackQuery):
+        return not (event.data or "").startswith("dp:")
+    if isinstance(event, Message):
+        return (event.text or "").startswith("/")
+    return False
@@ -0,0 +1,127 @@
+# app/middlewares/throttling.py
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.services.cleanup import schedule_delete, schedule_hint
+from app.utils.metrics import Counter
+from app.utils.update_context import answer_callback, current_stats
+
+logger = logging.getLogger(__name__)
+
+# сколько пользователей держим в памяти, прежде чем выкинуть полные вёдра
+MAX_BUCKETS = 50_000
+
+MESSAGE_HINT = "Не так быстро 🙂 Сообщение пропущено — отправь его чуть позже."
+# сколько секунд подсказка висит в чате
+HINT_TTL = 5.0
+
+THROTTLED = Counter(
+    "updates_throttled_total",
+    "Апдейты, отброшенные ограничением частоты",
+    labelnames=("kind",),
+)
+
+
+def _mark_throttled() -> None:
+    stats = current_stats()
+    if stats is not None:
+        stats.handler = "throttled"
+
+
+class _Budget:
+    """
+    Token bucket на пользователя: rate токенов в секунду, не больше burst.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = float(max(1, burst))
+        # user_id -> (токены, время последнего пополнения)
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+
+    def take(self, user_id: int, now: float) -> bool:
+        tokens, last = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1.0:
+            self._buckets[user_id] = (tokens, now)
+            return False
+        self._buckets[user_id] = (tokens - 1.0, now)
+        if len(self._buckets) > MAX_BUCKETS:
+            self._prune(now)
+        return True
+
+    def _prune(self, now: float) -> None:
+        # ведро, которое успело наполниться, ничем не отличается от нового
+        full_after = self.burst / self.rate
+        self._buckets = {
+            uid: (tokens, last)
+            for uid, (tokens, last) in self._buckets.items()
+            if now - last < full_after
+        }
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на update: ограничение частоты на пользователя,
+    отдельные бюджеты для сообщений и нажатий кнопок.
+
+    Лишнее нажатие получает короткий answerCallbackQuery (без запросов
+    в БД). Лишнее сообщение не обрабатывается и удаляется из чата;
+    подсказка об этом уходит одна на серию отброшенных сообщений
+    (в фоне, через cleanup) и сама удаляется через HINT_TTL секунд. Ставить до
+    UserLaneMiddleware, чтобы отброшенное не занимало очередь.
+    rate = 0 выключает ограничение для своего вида апдейтов.
+    """
+
+    def __init__(
+        self,
+        message_rate: float = 1.0,
+        message_burst: int = 5,
+        callback_rate: float = 3.0,
+        callback_burst: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._messages = _Budget(message_rate, message_burst) if message_rate > 0 else None
+        self._callbacks = _Budget(callback_rate, callback_burst) if callback_rate > 0 else None
+        self._clock = clock
+        # кому подсказка уже показана в текущей серии отброшенных сообщений
+        self._hinted: Set[int] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or not isinstance(event, Update):
+            return await handler(event, data)
+
+        if event.callback_query is not None and self._callbacks is not None:
+            if not self._callbacks.take(user.id, self._clock()):
+                THROTTLED.inc(kind="callback")
+                _mark_throttled()
+                await answer_callback(event.callback_query, "Не так быстро 🙂")
+                return None
+        elif event.message is not None and self._messages is not None:
+            if not self._messages.take(user.id, self._clock()):
+                THROTTLED.inc(kind="message")
+                _mark_throttled()
+                logger.debug("Throttling: сообщение user=%s отброшено", user.id)
+                schedule_delete(event.message)
+                if user.id not in self._hinted:
+                    if len(self._hinted) >= MAX_BUCKETS:
+                        self._hinted.clear()
+                    self._hinted.add(user.id)
+                    # вне апдейта: не держит его и уходит с приоритетом
+                    # фоновых уведомлений, а не ответов пользователям
+                    schedule_hint(event.message.chat.id, MESSAGE_HINT, HINT_TTL)
+                return None
+            self._hinted.discard(user.id)
+
+        return await handler(event, data)
+
@@ -0,0 +1,225 @@
+# app/middlewares/update_context.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Set
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from app.utils.metrics import Counter, Histogram
+from app.utils.update_context import (
+    UpdateStats,
+    answer_callback,
+    begin_update,
+    current_stats,
+    end_update,
+)
+
+logger = logging.getLogger(__name__)
+
+API_CALLS = Counter(
+    "bot_api_calls_total",
+    "Исходящие вызовы Bot API",
+    labelnames=("method",),
+)
+API_SECONDS = Histogram(
+    "bot_api_call_seconds",
+    "Длительность одного вызова Bot API",
+    labelnames=("method",),
+)
+
+_LABELS = ("update_type", "handler")
+UPDATE_SECONDS = Histogram(
+    "update_duration_seconds",
+    "Полное время обработки апдейта",
+    labelnames=_LABELS,
+)
+API_CALLS_PER_UPDATE = Histogram(
+    "update_api_calls",
+    "Число вызовов Bot API на один апдейт",
+    labelnames=_LABELS,
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+API_SECONDS_PER_UPDATE = Histogram(
+    "update_api_seconds",
+    "Суммарное время вызовов Bot API за апдейт",
+    labelnames=_LABELS,
+)
+DB_CALLS_PER_UPDATE = Histogram(
+    "update_db_calls",
+    "Число обращений к БД (соединений из пула) на один апдейт",
+    labelnames=_LABELS,
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50),
+)
+DB_SECONDS_PER_UPDATE = Histogram(
+    "update_db_seconds",
+    "Суммарное время работы с БД за апдейт, включая ожидание пула",
+    labelnames=_LABELS,
+)
+SLOW_UPDATES = Counter(
+    "updates_slow_total",
+    "Апдейты дольше порога SLOW_UPDATE_SECONDS",
+    labelnames=_LABELS,
+)
+
+DEFAULT_SLOW_THRESHOLD = 1.0
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на update: открывает контекст апдейта, после хендлера
+    отвечает на callback, если этого никто не сделал, и пишет в метрики
+    время апдейта, вызовы Bot API и обращения к БД — по типу апдейта
+    и хендлеру. Апдейты дольше slow_threshold секунд логируются
+    с разбивкой.
+
+    Стоит первым, поэтому здесь же считаются принятые апдейты для
+    остановки: между стартом задачи апдейта в aiogram и этим middleware
+    нет ни одного await — апдейт не может «проскочить» мимо счётчика,
+    пока ждёт троттлинг, очередь пользователя или FSM.
+    """
+
+    def __init__(self, slow_threshold: float = DEFAULT_SLOW_THRESHOLD):
+        self.slow_threshold = slow_threshold
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # задачи, в которых сейчас идут апдейты, — для отмены при остановке
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Принятые и ещё не завершённые апдейты.
+        """
+        return self._pending
+
+    async def wait_idle(self) -> None:
+        """
+        Дождаться, пока не останется принятых апдейтов.
+        """
+        await self._idle.wait()
+
+    async def cancel_pending(self) -> None:
+        """
+        Отменить апдейты, не успевшие завершиться, и дождаться отмены —
+        после этого они не ходят ни в Bot API, ни в пул БД.
+        """
+        tasks = [t for t in self._tasks if not t.done()]
+        if not tasks:
+            return
+        logger.warning("Отменяем %d незавершённых апдейтов", len(tasks))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        task = asyncio.current_task()
+        if task is not None:
+            self._tasks.add(task)
+        self._pending += 1
+        self._idle.clear()
+        token = begin_update()
+        stats = current_stats()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            try:
+                if isinstance(event, Update) and event.callback_query is not None:
+                    # не оставляем "часики" на кнопке
+                    await answer_callback(event.callback_query)
+            finally:
+                end_update(token)
+                self._observe(event, stats, time.perf_counter() - started)
+                self._tasks.discard(task)
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.set()
+
+    def _observe(self, event: TelegramObject, stats: UpdateStats, elapsed: float) -> None:
+        labels = {
+            "update_type": event.event_type if isinstance(event, Update) else "unknown",
+            "handler": stats.handler or "unhandled",
+        }
+        UPDATE_SECONDS.observe(elapsed, **labels)
+        API_CALLS_PER_UPDATE.observe(stats.api_calls, **labels)
+        API_SECONDS_PER_UPDATE.observe(stats.api_seconds, **labels)
+        DB_CALLS_PER_UPDATE.observe(stats.db_calls, **labels)
+        DB_SECONDS_PER_UPDATE.observe(stats.db_seconds, **labels)
+
+        slow = elapsed >= self.slow_threshold
+        if slow:
+            SLOW_UPDATES.inc(**labels)
+        if slow or logger.isEnabledFor(logging.DEBUG):
+            logger.log(
+                logging.WARNING if slow else logging.DEBUG,
+                "Update %s -> %s: %.3fs; БД %d обращ. / %.3fs; Bot API %d выз. / %.3fs (%s)",
+                labels["update_type"],
+                labels["handler"],
+                elapsed,
+                stats.db_calls,
+                stats.db_seconds,
+                stats.api_calls,
+                stats.api_seconds,
+                ", ".join(f"{m}={n}" for m, n in stats.api_methods.items()),
+            )
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+    Inner-middleware на message/callback_query роутеров: отмечает
+    в контексте апдейта, какой хендлер его обрабатывает.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = current_stats()
+        handler_obj = data.get("handler")
+        if stats is not None and handler_obj is not None:
+            stats.handler = getattr(handler_obj.callback, "__name__", "") or stats.handler
+        return await handler(event, data)
+
+
+class ApiCallCounterMiddleware(BaseRequestMiddleware):
+    """
+    Сессионный middleware Bot: считает каждый исходящий вызов API
+    и его длительность в контексте текущего апдейта и в общих метриках.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        name = type(method).__name__
+        API_CALLS.inc(method=name)
+        stats = current_stats()
+        if stats is not None:
+            stats.api_calls += 1
+            stats.api_methods[name] += 1
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            elapsed = time.perf_counter() - started
+            API_SECONDS.observe(elapsed, method=name)
+            if stats is not None:
+                stats.api_seconds += elapsed
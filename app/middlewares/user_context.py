@@ -0,0 +1,39 @@
+# app/middlewares/user_context.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.utils.user_context import bind, unbind
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на update: привязывает апдейт к пользователю и чату
+    (ContextVar в app.utils.user_context). В БД не ходит.
+
+    Настройки и ui_state грузятся одним запросом при первом обращении
+    хелпера (get_tz_offset и т.п.); ui_state не читается, если экран
+    уже в ui_cache. Тот же хелпер снимает флаг is_unreachable, если он
+    стоит (пользователь снова пишет боту). Апдейты, которым настройки
+    не нужны, отвечают на callback без лишнего запроса.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        chat = data.get("event_chat")
+        chat_id = chat.id if chat is not None else user.id
+
+        token = bind(user.id, chat_id)
+        try:
+            return await handler(event, data)
+        finally:
+            unbind(token)
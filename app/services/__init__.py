@@ -1,3 +1,3 @@
 # init-файл пакета services для модуля app.services.notifier
-from .notifier import notifier, _get_due_tasks as get_due_tasks
-__all__ = ["notifier", "get_due_tasks"]
\ No newline at end of file
+from .notifier import notifier, notifier_tick, _get_due_tasks as get_due_tasks
+__all__ = ["notifier", "notifier_tick", "get_due_tasks"]
\ No newline at end of file
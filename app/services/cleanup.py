@@ -0,0 +1,106 @@
+# app/services/cleanup.py
+"""
+Фоновое удаление сообщений пользователя (команды, введённый текст).
+
+Хендлеры только ставят сообщение в очередь своего чата (schedule_delete),
+а воркер раз в короткое окно удаляет накопившееся пачками через
+Bot API deleteMessages (до 100 id за вызов). Ожидание удаления больше
+не входит в время обработки апдейта.
+
+Тот же воркер отправляет временные подсказки (schedule_hint): вне апдейта
+они идут в планировщике исходящих с приоритетом фоновых уведомлений
+и через ttl секунд сами попадают в очередь на удаление.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from aiogram import Bot
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# лимит Bot API на один deleteMessages
+MAX_BATCH = 100
+DEFAULT_INTERVAL = 0.5
+
+_queues: Dict[int, List[int]] = {}
+# chat_id -> (текст, ttl); одна подсказка на чат
+_hints: Dict[int, Tuple[str, float]] = {}
+_wakeup = asyncio.Event()
+
+
+def schedule_delete(message: Message) -> None:
+    """
+    Поставить сообщение в очередь на удаление. Не ждёт Telegram.
+    """
+    _queues.setdefault(message.chat.id, []).append(message.message_id)
+    _wakeup.set()
+
+
+def schedule_hint(chat_id: int, text: str, ttl: float) -> None:
+    """
+    Отправить подсказку в чат в фоне и удалить её через ttl секунд.
+    Не ждёт Telegram.
+    """
+    _hints[chat_id] = (text, ttl)
+    _wakeup.set()
+
+
+async def send_hints(bot: Bot) -> None:
+    """
+    Отправить накопившиеся подсказки. При остановке не зовётся:
+    подсказка, которая сразу удалится, никому не нужна.
+    """
+    if not _hints:
+        return
+    pending = dict(_hints)
+    _hints.clear()
+
+    loop = asyncio.get_running_loop()
+    for chat_id, (text, ttl) in pending.items():
+        try:
+            hint = await bot.send_message(chat_id=chat_id, text=text)
+        except Exception:
+            # подсказка не критична
+            logger.debug("Cleanup: не удалось отправить подсказку chat=%s", chat_id)
+            continue
+        loop.call_later(ttl, schedule_delete, hint)
+
+
+async def flush(bot: Bot) -> None:
+    """
+    Удалить всё, что накопилось, по одному вызову на чат (на каждые 100 id).
+    """
+    if not _queues:
+        return
+    pending = dict(_queues)
+    _queues.clear()
+
+    for chat_id, ids in pending.items():
+        for i in range(0, len(ids), MAX_BATCH):
+            try:
+                await bot.delete_messages(
+                    chat_id=chat_id,
+                    message_ids=ids[i:i + MAX_BATCH],
+                )
+            except Exception:
+                # сообщение старше 48 часов / уже удалено — не критично
+                logger.debug("Cleanup: не удалось удалить сообщения chat=%s", chat_id)
+
+
+async def cleanup_worker(bot: Bot, interval: float = DEFAULT_INTERVAL) -> None:
+    logger.info("Cleanup: запущен")
+    try:
+        while True:
+            await _wakeup.wait()
+            _wakeup.clear()
+            # копим пачку, пока пользователь ещё что-то шлёт
+            await asyncio.sleep(interval)
+            try:
+                await send_hints(bot)
+                await flush(bot)
+            except Exception:
+                logger.exception("Cleanup: неожиданная ошибка")
+    finally:
+        logger.info("Cleanup: завершён")
@@ -0,0 +1,86 @@
+# app/services/digest.py
+import datetime
+import logging
+from itertools import groupby
+from types import ModuleType
+from typing import Any, Dict, List
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+
+from app.utils import storage
+from app.utils import ui as ui_utils
+
+logger = logging.getLogger(__name__)
+
+
+def _local_str(due_iso: str, offset_minutes: int, with_date: bool) -> str:
+    """
+    UTC ISO -> локальное время пользователя (local = UTC - offset).
+    """
+    d = datetime.datetime.fromisoformat(due_iso)
+    utc_naive = d.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    local = utc_naive - datetime.timedelta(minutes=offset_minutes)
+    return local.strftime("%Y-%m-%d %H:%M" if with_date else "%H:%M")
+
+
+def _digest_text(tasks: List[Dict]) -> str:
+    offset = tasks[0]["tz_offset_minutes"]
+    overdue = [t for t in tasks if t["is_overdue"]]
+    today = [t for t in tasks if not t["is_overdue"]]
+
+    lines = ["📋 Сводка на сегодня"]
+    if overdue:
+        lines.append("")
+        lines.append("Просрочено:")
+        for t in overdue:
+            lines.append(f"• {_local_str(t['due_at'], offset, True)} — {t['text']}")
+    if today:
+        lines.append("")
+        lines.append("Сегодня:")
+        for t in today:
+            lines.append(f"• {_local_str(t['due_at'], offset, False)} — {t['text']}")
+    return "\n".join(lines)
+
+
+async def send_daily_digests(
+    bot: Bot,
+    now: datetime.datetime,
+    store: ModuleType | Any = storage,
+) -> int:
+    """
+    Отправляет ежедневные сводки всем пользователям, у которых наступил
+    их локальный час. Все данные берутся одним запросом
+    storage.claim_daily_digests(), по одному сообщению на пользователя.
+    Сводки, которые не удалось отправить (сеть, 429), возвращаются
+    в очередь до следующего прохода; заблокировавшим бота — нет.
+    Возвращает число отправленных сводок.
+    """
+    rows = await store.claim_daily_digests(now)
+    sent = 0
+    failed: List[int] = []
+
+    for user_id, group in groupby(rows, key=lambda r: r["user_id"]):
+        tasks = list(group)
+        try:
+            if await ui_utils.show_notification(
+                bot=bot,
+                chat_id=user_id,
+                user_id=user_id,
+                text=_digest_text(tasks),
+            ):
+                sent += 1
+            else:
+                failed.append(user_id)
+        except TelegramForbiddenError:
+            logger.info("Digest: user=%s заблокировал бота", user_id)
+        except Exception:
+            logger.exception("Digest: не удалось отправить сводку user=%s", user_id)
+            failed.append(user_id)
+
+    if failed:
+        logger.warning("Digest: не отправлено %d сводок, повторим позже", len(failed))
+        await store.release_daily_digests(failed)
+    if sent:
+        logger.info("Digest: отправлено %d сводок", sent)
+    return sent
@@ -0,0 +1,161 @@
+# app/services/lifecycle.py
+"""
+Остановка процесса по шагам — быстрый и без потерь rolling restart.
+
+1. stop intake — перестать принимать апдейты (stop_polling / остановка
+   webhook-сервера), нотифаер не начинает новых проходов;
+2. drain — дождаться апдейтов в обработке и текущей пачки нотифаера;
+   что не успело — отменяется (on_timeout шага), и отмена дожидается
+   до flush;
+3. flush — дописать отложенное (ui_state, очередь удаления сообщений);
+4. close — закрыть HTTP-сессии Bot и пул БД.
+
+Шаги 1–3 укладываются в один общий срок timeout: каждый следующий
+получает только остаток, flush-шаг, не успевший к сроку, прерывается.
+Close выполняется всегда, каждый шаг не дольше CLOSE_STEP_TIMEOUT.
+
+Шаги регистрируются при старте (on_stop_intake / on_drain / on_flush /
+on_close) и выполняются в порядке регистрации; ошибка одного шага
+логируется и не мешает остальным.
+"""
+import asyncio
+import logging
+import signal
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 8.0
+CLOSE_STEP_TIMEOUT = 1.0
+
+Step = Callable[[], Awaitable[Any]]
+
+
+class Lifecycle:
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._deadline = 0.0
+        # выставляется в начале остановки; фоновые циклы смотрят на него
+        self.stopping = asyncio.Event()
+        self._stop_intake: List[Tuple[str, Step]] = []
+        self._drain: List[Tuple[str, Step, Optional[Step]]] = []
+        self._flush: List[Tuple[str, Step]] = []
+        self._close: List[Tuple[str, Step]] = []
+
+    def on_stop_intake(self, name: str, step: Step) -> None:
+        self._stop_intake.append((name, step))
+
+    def on_drain(self, name: str, step: Step, on_timeout: Optional[Step] = None) -> None:
+        """
+        step — ожидание завершения; on_timeout — отмена того, что
+        не успело (сам step при таймауте отменяется всегда).
+        """
+        self._drain.append((name, step, on_timeout))
+
+    def on_flush(self, name: str, step: Step) -> None:
+        self._flush.append((name, step))
+
+    def on_close(self, name: str, step: Step) -> None:
+        self._close.append((name, step))
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # на Windows add_signal_handler нет — там только Ctrl+C -> KeyboardInterrupt
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(sig, self.stopping.set)
+
+    async def serve(self, intake: Awaitable[Any]) -> None:
+        """
+        Работать, пока intake (приём апдейтов) не завершится сам
+        или не придёт SIGINT/SIGTERM, затем остановиться по шагам.
+        """
+        intake_task = asyncio.ensure_future(intake)
+        stop_task = asyncio.create_task(self.stopping.wait())
+        try:
+            await asyncio.wait({intake_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            await self.shutdown(intake_task)
+
+    async def shutdown(self, intake_task: "asyncio.Future[Any]") -> None:
+        self.stopping.set()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._deadline = started + self.timeout
+        logger.info("Lifecycle: остановка, срок %.1fс", self.timeout)
+
+        await self._run_steps("stop intake", self._stop_intake, self._remaining)
+        await self._wait_intake(intake_task)
+        await self._drain_all()
+        await self._run_steps("flush", self._flush, self._remaining)
+        await self._run_steps("close", self._close, lambda: CLOSE_STEP_TIMEOUT)
+        logger.info("Lifecycle: остановлено за %.2fс", loop.time() - started)
+
+    def _remaining(self) -> float:
+        return max(0.0, self._deadline - asyncio.get_running_loop().time())
+
+    async def _wait_intake(self, intake_task: "asyncio.Future[Any]") -> None:
+        done, _ = await asyncio.wait({intake_task}, timeout=self._remaining())
+        if not done:
+            logger.warning("Lifecycle: приём апдейтов не остановился к сроку")
+            intake_task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await intake_task
+            return
+        if not intake_task.cancelled() and intake_task.exception() is not None:
+            logger.error("Lifecycle: приём апдейтов упал", exc_info=intake_task.exception())
+
+    async def _drain_all(self) -> None:
+        if not self._drain:
+            return
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = {
+            asyncio.ensure_future(step()): (name, on_timeout)
+            for name, step, on_timeout in self._drain
+        }
+        done, pending = await asyncio.wait(tasks, timeout=self._remaining())
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("Lifecycle: drain %s", tasks[task][0], exc_info=task.exception())
+        for task in pending:
+            name, on_timeout = tasks[task]
+            logger.warning("Lifecycle: %s не завершился к сроку, отменяем", name)
+            task.cancel()
+            if on_timeout is not None:
+                try:
+                    await on_timeout()
+                except Exception:
+                    logger.exception("Lifecycle: ошибка отмены %s", name)
+        if pending:
+            await asyncio.wait(pending)
+        logger.info("Lifecycle: drain за %.2fс", loop.time() - started)
+
+    async def _run_steps(
+        self,
+        phase: str,
+        steps: List[Tuple[str, Step]],
+        budget: Callable[[], float],
+    ) -> None:
+        for name, step in steps:
+            timeout = budget()
+            if timeout <= 0:
+                logger.warning("Lifecycle: %s: срок вышел, шаг %s пропущен", phase, name)
+                continue
+            try:
+                await asyncio.wait_for(step(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Lifecycle: %s: шаг %s прерван по сроку", phase, name)
+            except Exception:
+                logger.exception("Lifecycle: %s: ошибка шага %s", phase, name)
+
+
+async def cancel_task(task: "asyncio.Task[Any]") -> None:
+    """
+    Отменить фоновую задачу и дождаться её завершения.
+    """
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
@@ -0,0 +1,33 @@
+# app/services/metrics_server.py
+import logging
+
+from aiohttp import web
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=metrics.render(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"X-Content-Format": "prometheus-0.0.4"},
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Поднимает HTTP-эндпоинт GET /metrics для Prometheus.
+    Возвращает runner — для остановки вызвать `await runner.cleanup()`.
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Metrics: эндпоинт http://%s:%s/metrics запущен", host, port)
+    return runner
@@ -2,115 +2,287 @@
 import asyncio
 import datetime
 import logging
-from typing import List, Dict
+import time
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
 
 from app.utils import storage
 from app.utils import ui as ui_utils
 from app.utils.timezone import is_due_now
+from app.services.digest import send_daily_digests
+from app.utils.metrics import Counter, Gauge, Histogram
 
 logger = logging.getLogger(__name__)
 
 
-async def _get_due_tasks(until: datetime.datetime) -> List[Dict]:
+# ---------- метрики нотифаера ----------
+
+TICK_SECONDS = Histogram(
+    "notifier_tick_duration_seconds",
+    "Длительность одного прохода нотифаера",
+)
+DUE_ROWS_SCANNED = Counter(
+    "notifier_due_rows_scanned_total",
+    "Сколько строк с дедлайном просмотрено нотифаером",
+)
+SENT = Counter(
+    "notifier_sent_total",
+    "Отправленные напоминания",
+)
+FAILED = Counter(
+    "notifier_failed_total",
+    "Неудачные попытки отправить напоминание",
+)
+DELIVERY_LAG_SECONDS = Histogram(
+    "notifier_delivery_lag_seconds",
+    "Задержка доставки напоминания: время отправки - due_at",
+)
+LAST_TICK = Gauge(
+    "notifier_last_tick",
+    "Показатели последнего прохода нотифаера",
+    labelnames=("field",),
+)
+
+
+def _utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _delivery_lag(due_at: str | None, sent_at: datetime.datetime) -> float | None:
+    if not due_at:
+        return None
+    try:
+        due = datetime.datetime.fromisoformat(due_at)
+    except ValueError:
+        return None
+    if due.tzinfo is None:
+        due = due.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (sent_at - due).total_seconds())
+
+
+async def _get_due_tasks(
+    until: datetime.datetime,
+    store: ModuleType | Any = storage,
+) -> List[Dict]:
     """
     Возвращает список задач, у которых due_at <= until.
     Использует storage.list_due_tasks(until).
     """
     try:
-        return await storage.list_due_tasks(until)
+        return await store.list_due_tasks(until)
     except Exception:
         logger.exception("Notifier: ошибка при получении задач")
         return []
 
 
-async def notifier(bot: Bot, interval_seconds: int = 30) -> None:
+@dataclass
+class TickResult:
+    due_rows: int
+    sent: int
+    failed: int
+    duration_seconds: float
+
+
+async def notifier_tick(
+    bot: Bot,
+    now: datetime.datetime,
+    *,
+    clock: Callable[[], datetime.datetime] = _utc_now,
+    store: ModuleType | Any = storage,
+    stop: Optional[asyncio.Event] = None,
+) -> TickResult:
+    """
+    Один проход нотифаера для момента `now`.
+
+    clock — источник "текущего" времени для расчёта задержки доставки,
+    store — хранилище с интерфейсом app.utils.storage; оба подменяются
+    в бенчмарке (benchmarks/notifier_bench.py).
+    stop — при остановке процесса проход заканчивается после текущей
+    задачи (отправка + сброс дедлайна); остальные дошлёт следующий процесс.
+    """
+    tick_started = time.perf_counter()
+    due_tasks = await _get_due_tasks(now, store)
+    sent = 0
+    failed = 0
+
+    if due_tasks:
+        logger.debug(
+            "Notifier: найдено %d задач для проверки нотификации",
+            len(due_tasks),
+        )
+
+    # пользователи, заблокировавшие бота в этом проходе
+    unreachable: set[int] = set()
+
+    for t in due_tasks:
+        if stop is not None and stop.is_set():
+            logger.info("Notifier: остановка, проход прерван")
+            break
+        user_id = int(t["user_id"])
+        task_id = int(t["id"])
+        if user_id in unreachable:
+            continue
+        text = str(t.get("text", "") or "")
+        due_at = t.get("due_at")  # ISO локального времени пользователя
+
+        # дедлайн наступил с учётом tz_offset?
+        if not await is_due_now(user_id, due_at, now=now):
+            continue
+
+        # считаем человеческий номер задачи
+        tasks_all = await store.list_user_tasks(user_id)
+        tasks_sorted = sorted(
+            tasks_all,
+            key=lambda t: (t.get("is_done", 0), t.get("id", 0)),
+        )
+
+        display_num = task_id
+        for idx, tt in enumerate(tasks_sorted, start=1):
+            if int(tt.get("id", -1)) == task_id:
+                display_num = idx
+                break
+
+        message_text = f"⏰ Напоминание: задача №{display_num}\n{text}"
+        if due_at:
+            message_text += f"\nДедлайн: {due_at}"
+
+        # отправляем уведомление, не трогая ui_state
+        try:
+            delivered = await ui_utils.show_notification(
+                bot=bot,
+                chat_id=user_id,
+                user_id=user_id,
+                text=message_text,
+            )
+        except TelegramForbiddenError:
+            # флаг is_unreachable уже выставлен в show_notification,
+            # до следующего обращения пользователя его задачи не выбираются
+            unreachable.add(user_id)
+            failed += 1
+            logger.info("Notifier: user=%s заблокировал бота, пропускаем", user_id)
+            continue
+        except Exception:
+            logger.warning(
+                "Notifier: ошибка отправки уведомления user=%s task=%s",
+                user_id,
+                task_id,
+                exc_info=True,
+            )
+            delivered = False
+
+        if not delivered:
+            failed += 1
+            logger.warning(
+                "Notifier: не удалось отправить уведомление user=%s task=%s",
+                user_id,
+                task_id,
+            )
+            # не сбрасываем due, попробуем позже
+            continue
+
+        sent += 1
+        lag = _delivery_lag(due_at, clock())
+        if lag is not None:
+            DELIVERY_LAG_SECONDS.observe(lag)
+        logger.debug("Notifier: уведомление отправлено user=%s task=%s", user_id, task_id)
+
+        # сбрасываем дедлайн и очищаем ui_state ОДИН раз,
+        # чтобы не дублировать уведомление
+        try:
+            await store.clear_task_due(user_id, task_id)
+            # чат приватный, chat_id = user_id
+            await store.delete_ui_message_id(
+                chat_id=user_id,
+                user_id=user_id,
+            )
+        except Exception:
+            logger.exception(
+                "Notifier: ошибка при сбросе дедлайна или очистке ui_state user=%s task=%s",
+                user_id,
+                task_id,
+            )
+
+    # ежедневные сводки (один запрос на всех пользователей)
+    if stop is None or not stop.is_set():
+        try:
+            await send_daily_digests(bot, now, store=store)
+        except Exception:
+            logger.exception("Notifier: ошибка при отправке сводок")
+
+    tick_seconds = time.perf_counter() - tick_started
+    TICK_SECONDS.observe(tick_seconds)
+    DUE_ROWS_SCANNED.inc(len(due_tasks))
+    SENT.inc(sent)
+    FAILED.inc(failed)
+    LAST_TICK.set(tick_seconds, field="duration_seconds")
+    LAST_TICK.set(len(due_tasks), field="due_rows")
+    LAST_TICK.set(sent, field="sent")
+    LAST_TICK.set(failed, field="failed")
+    if sent or failed:
+        logger.info(
+            "Notifier: проход %.3fs, строк=%d, отправлено=%d, ошибок=%d",
+            tick_seconds,
+            len(due_tasks),
+            sent,
+            failed,
+        )
+
+    return TickResult(
+        due_rows=len(due_tasks),
+        sent=sent,
+        failed=failed,
+        duration_seconds=tick_seconds,
+    )
+
+
+async def notifier(
+    bot: Bot,
+    interval_seconds: int = 30,
+    *,
+    clock: Callable[[], datetime.datetime] = _utc_now,
+    sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    store: ModuleType | Any = storage,
+    stop: Optional[asyncio.Event] = None,
+) -> None:
     """
     Цикл: проверяем due, отправляем новое уведомление с кнопкой 'список команд',
     забываем ui_state (message_id), дедлайн сбрасываем.
+    clock/sleep/store можно подменить (фейковые часы и хранилище в бенчмарке).
+    stop — мягкая остановка: текущая пачка дорабатывает до конца задачи,
+    новый проход не начинается, цикл завершается.
     """
     logger.info("Notifier: запущен")
     try:
-        while True:
+        while stop is None or not stop.is_set():
             try:
-                now = datetime.datetime.now(datetime.timezone.utc)
-                due_tasks = await _get_due_tasks(now)
-
-                if due_tasks:
-                    logger.debug(
-                        "Notifier: найдено %d задач для проверки нотификации",
-                        len(due_tasks),
-                    )
-
-                for t in due_tasks:
-                    user_id = int(t["user_id"])
-                    task_id = int(t["id"])
-                    text = str(t.get("text", "") or "")
-                    due_at = t.get("due_at")  # ISO локального времени пользователя
-
-                    # дедлайн наступил с учётом tz_offset?
-                    if not await is_due_now(user_id, due_at, now=now):
-                        continue
-
-                    # считаем человеческий номер задачи
-                    tasks_all = await storage.list_user_tasks(user_id)
-                    tasks_sorted = sorted(
-                        tasks_all,
-                        key=lambda t: (t.get("is_done", 0), t.get("id", 0)),
-                    )
-
-                    display_num = task_id
-                    for idx, tt in enumerate(tasks_sorted, start=1):
-                        if int(tt.get("id", -1)) == task_id:
-                            display_num = idx
-                            break
-
-                    message_text = f"⏰ Напоминание: задача №{display_num}\n{text}"
-                    if due_at:
-                        message_text += f"\nДедлайн: {due_at}"
-
-                    # отправляем уведомление, не трогая ui_state
-                    try:
-                        await ui_utils.show_notification(
-                            bot=bot,
-                            chat_id=user_id,
-                            user_id=user_id,
-                            text=message_text,
-                        )
-                        logger.info("Notifier: уведомление отправлено user=%s task=%s", user_id, task_id)
-                    except Exception:
-                        logger.exception(
-                            "Notifier: не удалось отправить уведомление user=%s task=%s",
-                            user_id,
-                            task_id,
-                        )
-                        # не сбрасываем due, попробуем позже
-                        continue
-
-                    # сбрасываем дедлайн, чтобы не дублировать уведомление
-                                        # 4) сбрасываем дедлайн и очищаем ui_state ОДИН раз
-                    try:
-                        await storage.clear_task_due(user_id, task_id)
-                        # чат приватный, chat_id = user_id
-                        await storage.delete_ui_message_id(
-                            chat_id=user_id,
-                            user_id=user_id,
-                        )
-                    except Exception:
-                        logger.exception(
-                            "Notifier: ошибка при сбросе дедлайна или очистке ui_state user=%s task=%s",
-                            user_id,
-                            task_id,
-                        )
-
-
-                await asyncio.sleep(interval_seconds)
+                await notifier_tick(bot, clock(), clock=clock, store=store, stop=stop)
+                await _sleep_or_stop(sleep, interval_seconds, stop)
 
             except asyncio.CancelledError:
                 raise
             except Exception:
                 logger.exception("Notifier: неожиданная ошибка в цикле")
-                await asyncio.sleep(10)
+                await _sleep_or_stop(sleep, 10, stop)
     finally:
         logger.info("Notifier: завершён")
+
+
+async def _sleep_or_stop(
+    sleep: Callable[[float], Awaitable[Any]],
+    seconds: float,
+    stop: Optional[asyncio.Event],
+) -> None:
+    if stop is None:
+        await sleep(seconds)
+        return
+    sleeper = asyncio.ensure_future(sleep(seconds))
+    stopper = asyncio.ensure_future(stop.wait())
+    try:
+        await asyncio.wait({sleeper, stopper}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sleeper.cancel()
+        stopper.cancel()
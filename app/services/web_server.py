@@ -0,0 +1,39 @@
+# app/services/web_server.py
+import contextlib
+
+import uvicorn
+
+from app.web_python.main import app
+
+
+class EmbeddedServer(uvicorn.Server):
+    """
+    uvicorn внутри чужого event loop: сигналы ловит запускающий код,
+    остановка — server.should_exit = True.
+    """
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # uvicorn >= 0.29: иначе после остановки он повторно шлёт
+        # пойманный SIGTERM процессу, и тот умирает, не закрыв пул
+        yield
+
+    def install_signal_handlers(self) -> None:
+        # то же для uvicorn < 0.29
+        pass
+
+
+def create_web_server(host: str, port: int) -> EmbeddedServer:
+    """
+    FastAPI-приложение (app.web_python.main) на том же loop, что и бот.
+    Пул БД к этому моменту уже поднят: startup приложения
+    (init_db_and_schema) его переиспользует.
+    """
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_config=None,  # логирование уже настроено процессом
+        access_log=False,
+    )
+    return EmbeddedServer(config)
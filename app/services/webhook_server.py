@@ -0,0 +1,47 @@
+# app/services/webhook_server.py
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+async def _handle_health(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+async def start_webhook_server(
+    bot: Bot,
+    dp: Dispatcher,
+    host: str,
+    port: int,
+    path: str,
+    secret: str,
+) -> web.AppRunner:
+    """
+    Поднимает POST <path> для апдейтов Telegram и GET /healthz
+    для балансировщика. Возвращает runner — для остановки вызвать
+    `await runner.cleanup()`.
+
+    Запрос без верного X-Telegram-Bot-Api-Secret-Token отклоняется.
+    Апдейт обрабатывается до ответа (handle_in_background=False):
+    если реплика упала посреди обработки, Telegram не получит 200
+    и доставит апдейт повторно — в том числе на другую реплику.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        handle_in_background=False,
+    ).register(app, path=path)
+    app.router.add_get("/healthz", _handle_health)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Webhook: эндпоинт http://%s:%s%s запущен", host, port, path)
+    return runner
@@ -0,0 +1,135 @@
+# app/utils/callback_router.py
+"""
+Диспетчер callback-кнопок по схеме "namespace:action:arg:...".
+
+Вместо десятка F.data-фильтров, которые aiogram проверяет по очереди
+на каждый callback, на роутер вешается один хендлер:
+  - callback_data разбирается один раз в CallbackData;
+  - хендлер ищется dict-лукапом по (namespace, action),
+    затем по (namespace, None) — маршрут на всё пространство имён;
+  - аргументы приводятся к типам маршрута, ошибка разбора
+    обрабатывается здесь же, а не в каждом хендлере.
+
+Старые строки без двоеточия ("cmd_list", "noop") разбираются
+по первому "_": ("cmd", "list"), ("noop", "").
+"""
+import inspect
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from app.utils.update_context import answer_callback, current_stats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CallbackData:
+    namespace: str
+    action: str
+    args: Tuple[Any, ...] = ()
+
+
+def parse_callback(data: str) -> CallbackData:
+    if ":" in data:
+        namespace, _, rest = data.partition(":")
+        action, _, tail = rest.partition(":")
+        return CallbackData(namespace, action, tuple(tail.split(":")) if tail else ())
+    namespace, _, action = data.partition("_")
+    return CallbackData(namespace, action)
+
+
+class _Route:
+    __slots__ = ("handler", "converters", "params", "takes_all")
+
+    def __init__(self, handler: Callable, converters: Tuple[Callable[[str], Any], ...]):
+        self.handler = handler
+        self.converters = converters
+        sig = inspect.signature(handler)
+        params = list(sig.parameters.values())[1:]  # первый — сам CallbackQuery
+        self.params = frozenset(p.name for p in params)
+        self.takes_all = any(p.kind is p.VAR_KEYWORD for p in params)
+
+    def bind(self, cb: CallbackData) -> CallbackData:
+        if len(cb.args) != len(self.converters):
+            raise ValueError(f"ожидалось {len(self.converters)} аргументов, получено {len(cb.args)}")
+        return replace(cb, args=tuple(conv(a) for conv, a in zip(self.converters, cb.args)))
+
+    def kwargs(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.takes_all:
+            return data
+        return {k: v for k, v in data.items() if k in self.params}
+
+
+class CallbackRouter:
+    def __init__(self, name: str = "callbacks"):
+        self.name = name
+        self._routes: Dict[Tuple[str, Optional[str]], _Route] = {}
+
+    def route(
+        self,
+        namespace: str,
+        action: Optional[str] = None,
+        *converters: Callable[[str], Any],
+    ) -> Callable[[Callable], Callable]:
+        """
+        Зарегистрировать хендлер на namespace:action (action=None — на всё
+        пространство имён). converters — по одному на аргумент после action.
+        Хендлер получает CallbackQuery первым аргументом, остальное —
+        по именам, как в aiogram; разобранные данные — в параметре cb.
+        Функция возвращается без изменений, поэтому декоратор можно
+        ставить рядом с @router.message(...).
+        """
+        def decorator(handler: Callable) -> Callable:
+            key = (namespace, action)
+            if key in self._routes:
+                raise ValueError(f"{self.name}: маршрут {namespace}:{action} уже занят")
+            self._routes[key] = _Route(handler, converters)
+            return handler
+
+        return decorator
+
+    def _lookup(self, cb: CallbackData) -> Optional[_Route]:
+        route = self._routes.get((cb.namespace, cb.action))
+        if route is None:
+            route = self._routes.get((cb.namespace, None))
+        return route
+
+    async def _match(self, query: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        if not query.data:
+            return False
+        cb = parse_callback(query.data)
+        route = self._lookup(cb)
+        if route is None:
+            return False
+        return {"cb": cb, "cb_route": route}
+
+    async def _dispatch(
+        self,
+        query: CallbackQuery,
+        cb: CallbackData,
+        cb_route: _Route,
+        **data: Any,
+    ) -> Any:
+        try:
+            cb = cb_route.bind(cb)
+        except (ValueError, TypeError) as exc:
+            # кнопка старого формата или подделанные данные
+            logger.debug("%s: не разобран callback %r: %s", self.name, query.data, exc)
+            await answer_callback(query, "Кнопка устарела, открой экран заново.", show_alert=True)
+            return None
+        data["cb"] = cb
+        stats = current_stats()
+        if stats is not None:
+            # в метриках — настоящий хендлер, а не общий _dispatch
+            stats.handler = cb_route.handler.__name__
+        return await cb_route.handler(query, **cb_route.kwargs(data))
+
+    def attach(self, router: Router) -> None:
+        """
+        Повесить диспетчер на router одним callback-хендлером.
+        """
+        router.callback_query.register(self._dispatch, self._match)
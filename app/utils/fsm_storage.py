@@ -0,0 +1,197 @@
+# app/utils/fsm_storage.py
+"""
+FSM-хранилище aiogram поверх пула asyncpg (таблица fsm_state).
+
+- состояние и данные переживают рестарт и общие для всех реплик;
+- чтение — из локального кэша, при промахе одна выборка из БД;
+- запись — сразу в БД (write-through), одна строка на ключ;
+  запись без изменений (тот же state / те же data) в БД не идёт;
+- пустая запись (state=None, data={}) удаляется, а не хранится;
+- о каждой записи уходит NOTIFY, другие процессы выкидывают ключ из кэша.
+"""
+import copy
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.db.core import acquire, listen
+
+logger = logging.getLogger(__name__)
+
+# канал NOTIFY: запись FSM изменена; payload — "<origin>|<ключ>"
+FSM_CHANGED_CHANNEL = "fsm_state_changed"
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+# (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+Key = Tuple[int, int, int, int, str, str]
+
+
+def _key(key: StorageKey) -> Key:
+    return (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id or 0,
+        key.business_connection_id or "",
+        key.destiny,
+    )
+
+
+def _key_to_payload(k: Key) -> str:
+    # destiny последним: в нём теоретически может быть ':'
+    return ":".join(str(part) for part in k)
+
+
+def _payload_to_key(payload: str) -> Key:
+    bot_id, chat_id, user_id, thread_id, bcid, destiny = payload.split(":", 5)
+    return int(bot_id), int(chat_id), int(user_id), int(thread_id), bcid, destiny
+
+
+class _Record:
+    __slots__ = ("state", "data")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any]):
+        self.state = state
+        self.data = data
+
+
+class PgStorage(BaseStorage):
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._cache: "OrderedDict[Key, _Record]" = OrderedDict()
+        self._max_entries = max_entries
+        # метка процесса в уведомлениях — свои записи не инвалидируем
+        self._instance_id = uuid.uuid4().hex[:12]
+
+    async def start(self) -> None:
+        """
+        Подписаться на изменения от других процессов.
+        Вызывать после init_db_and_schema().
+        """
+        await listen(FSM_CHANGED_CHANNEL, self._on_changed, on_reconnect=self._on_reconnect)
+
+    # ---------- кэш ----------
+
+    def _remember(self, k: Key, record: _Record) -> None:
+        self._cache[k] = record
+        self._cache.move_to_end(k)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    def _on_changed(self, payload: str) -> None:
+        origin, _, raw_key = payload.partition("|")
+        if origin == self._instance_id:
+            return
+        try:
+            self._cache.pop(_payload_to_key(raw_key), None)
+        except ValueError:
+            return
+
+    def _on_reconnect(self) -> None:
+        # уведомления за время обрыва LISTEN потеряны — читаем всё из БД заново
+        self._cache.clear()
+        logger.info("FSM: кэш сброшен после переподключения LISTEN")
+
+    async def _record(self, k: Key) -> _Record:
+        record = self._cache.get(k)
+        if record is not None:
+            self._cache.move_to_end(k)
+            return record
+
+        async with acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT state, data
+                FROM fsm_state
+                WHERE bot_id = $1 AND chat_id = $2 AND user_id = $3
+                  AND thread_id = $4 AND business_connection_id = $5 AND destiny = $6
+                """,
+                *k,
+            )
+
+        # пока ждали БД, запись могли обновить — она свежее
+        record = self._cache.get(k)
+        if record is None:
+            if row is None:
+                record = _Record(None, {})
+            else:
+                record = _Record(row["state"], json.loads(row["data"]))
+            self._remember(k, record)
+        return record
+
+    # ---------- БД ----------
+
+    async def _write(self, k: Key, state: Optional[str], data: Dict[str, Any]) -> None:
+        payload = f"{self._instance_id}|{_key_to_payload(k)}"
+        async with acquire() as conn:
+            if state is None and not data:
+                await conn.execute(
+                    """
+                    WITH d AS (
+                        DELETE FROM fsm_state
+                        WHERE bot_id = $1 AND chat_id = $2 AND user_id = $3
+                          AND thread_id = $4 AND business_connection_id = $5 AND destiny = $6
+                    )
+                    SELECT pg_notify($7, $8)
+                    """,
+                    *k,
+                    FSM_CHANGED_CHANNEL,
+                    payload,
+                )
+            else:
+                await conn.execute(
+                    """
+                    WITH w AS (
+                        INSERT INTO fsm_state (
+                            bot_id, chat_id, user_id, thread_id,
+                            business_connection_id, destiny, state, data, updated_at
+                        )
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8::jsonb, NOW())
+                        ON CONFLICT (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+                        DO UPDATE SET state = EXCLUDED.state,
+                                      data = EXCLUDED.data,
+                                      updated_at = NOW()
+                    )
+                    SELECT pg_notify($9, $10)
+                    """,
+                    *k,
+                    state,
+                    json.dumps(data, ensure_ascii=False),
+                    FSM_CHANGED_CHANNEL,
+                    payload,
+                )
+        self._remember(k, _Record(state, data))
+
+    # ---------- BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = _key(key)
+        value = state.state if isinstance(state, State) else state
+        record = await self._record(k)
+        if record.state == value:
+            return
+        await self._write(k, value, record.data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        k = _key(key)
+        # своя копия: хендлеры меняют полученные dict'ы на месте
+        new_data = copy.deepcopy(dict(data))
+        record = await self._record(k)
+        if record.data == new_data:
+            return
+        await self._write(k, record.state, new_data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._record(_key(key))).data)
+
+    async def close(self) -> None:
+        # пул и LISTEN-соединение закрывает close_db()
+        self._cache.clear()
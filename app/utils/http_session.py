@@ -0,0 +1,50 @@
+# app/utils/http_session.py
+"""
+HTTP-сессии Bot-клиента с настройками из config (BOT_HTTP_*).
+
+Интерактивные вызовы (экраны, ответы на кнопки) и рассылка нотифаера
+могут идти через разные сессии — у каждой свой пул соединений,
+и пачка напоминаний не занимает соединения, нужные чату.
+"""
+from typing import Any
+
+from aiogram.client.session.aiohttp import AiohttpSession
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    AiohttpSession с настраиваемым keep-alive соединений
+    (в aiogram задаются только limit и timeout).
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        **kwargs: Any,
+    ):
+        super().__init__(limit=limit, **kwargs)
+        # параметры TCPConnector: коннектор создаётся лениво в create_session()
+        self._connector_init["limit_per_host"] = limit_per_host
+        self._connector_init["keepalive_timeout"] = keepalive_timeout
+
+
+def build_session(
+    *,
+    pool_size: int,
+    keepalive_timeout: float,
+    request_timeout: float,
+) -> TunedAiohttpSession:
+    """
+    pool_size — максимум одновременных соединений с api.telegram.org,
+    keepalive_timeout — сколько секунд держать простаивающее соединение,
+    request_timeout — таймаут одного запроса (getUpdates к нему
+    добавляет polling timeout).
+    """
+    return TunedAiohttpSession(
+        limit=pool_size,
+        keepalive_timeout=keepalive_timeout,
+        timeout=request_timeout,
+    )
@@ -0,0 +1,201 @@
+# app/utils/metrics.py
+"""
+Минимальные in-process метрики (counter / gauge / histogram)
+с выводом в текстовом формате Prometheus.
+
+Значения доступны прямо в процессе (snapshot()), а render()
+отдаётся HTTP-эндпоинтом /metrics (app.services.metrics_server).
+"""
+import abc
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# бакеты по умолчанию — секунды, от миллисекунд до минут
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+_registry: List["_Metric"] = []
+_lock = threading.Lock()
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: ожидались метки {self.labelnames}, получены {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _fmt_labels(self, values: LabelValues, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, values)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus."""
+
+    @abc.abstractmethod
+    def snapshot(self) -> Dict:
+        """Текущие значения по наборам меток."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._fmt_labels(k)} {_num(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+    def snapshot(self) -> Dict:
+        return dict(self._values)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._fmt_labels(k)} {_num(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+    def snapshot(self) -> Dict:
+        return dict(self._values)
+
+
+class _HistogramState:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._states: Dict[LabelValues, _HistogramState] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        st = self._states.get(key)
+        if st is None:
+            st = self._states[key] = _HistogramState(len(self.buckets))
+        idx = bisect.bisect_left(self.buckets, value)
+        if idx < len(self.buckets):
+            st.counts[idx] += 1
+        st.total += value
+        st.count += 1
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        for key, st in sorted(self._states.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets, st.counts):
+                cumulative += c
+                le = self._fmt_labels(key, f'le="{_num(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            inf = self._fmt_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {st.count}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {_num(st.total)}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {st.count}")
+        return lines
+
+    def snapshot(self) -> Dict:
+        return {
+            key: {
+                "count": st.count,
+                "sum": st.total,
+                "buckets": dict(zip(self.buckets, st.counts)),
+            }
+            for key, st in self._states.items()
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def render() -> str:
+    """
+    Все зарегистрированные метрики в текстовом формате Prometheus.
+    """
+    with _lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for m in metrics:
+        lines.append(f"# HELP {m.name} {m.documentation}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, Dict]:
+    """
+    Текущие значения всех метрик — для просмотра внутри процесса.
+    """
+    with _lock:
+        metrics = list(_registry)
+    return {m.name: m.snapshot() for m in metrics}
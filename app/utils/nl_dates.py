@@ -0,0 +1,271 @@
+# app/utils/nl_dates.py
+"""
+Разбор срока, введённого текстом:
+  «завтра 9:00», «tomorrow at 9am», «через 2 часа», «in 30 min»,
+  «пт 18:00», «в субботу», «до пятницы», «2026-11-01 14:30», «01.11 14:30»,
+  «18:00».
+
+Всё считается в локальном времени пользователя и переводится в UTC
+по той же формуле, что и пикер: UTC = local + offset.
+Регулярки компилируются один раз при импорте, на каждую форму —
+один fullmatch, словари слов — обычные dict-лукапы.
+"""
+import datetime as dt
+import re
+from typing import Optional, Tuple
+
+# время по умолчанию, если указан только день
+DEFAULT_TIME = (9, 0)
+# сколько последних слов текста задачи пробуем как срок
+MAX_TAIL_WORDS = 4
+
+_RELATIVE_DAYS = {
+    "сегодня": 0,
+    "today": 0,
+    "завтра": 1,
+    "tomorrow": 1,
+    "tmrw": 1,
+    "послезавтра": 2,
+}
+
+# вместе с формами после «до» (родительный) и «к» (дательный)
+_WEEKDAYS = {
+    "пн": 0, "пон": 0, "понедельник": 0, "понедельника": 0, "понедельнику": 0,
+    "mon": 0, "monday": 0,
+    "вт": 1, "вторник": 1, "вторника": 1, "вторнику": 1,
+    "tue": 1, "tues": 1, "tuesday": 1,
+    "ср": 2, "среда": 2, "среду": 2, "среды": 2, "среде": 2,
+    "wed": 2, "wednesday": 2,
+    "чт": 3, "четверг": 3, "четверга": 3, "четвергу": 3,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3,
+    "пт": 4, "пятница": 4, "пятницу": 4, "пятницы": 4, "пятнице": 4,
+    "fri": 4, "friday": 4,
+    "сб": 5, "суббота": 5, "субботу": 5, "субботы": 5, "субботе": 5,
+    "sat": 5, "saturday": 5,
+    "вс": 6, "воскресенье": 6, "воскресенья": 6, "воскресенью": 6,
+    "sun": 6, "sunday": 6,
+}
+
+_UNITS = {}
+for _names, _delta in (
+    (("м", "мин", "минута", "минуту", "минуты", "минут",
+      "m", "min", "mins", "minute", "minutes"), dt.timedelta(minutes=1)),
+    (("полчаса",), dt.timedelta(minutes=30)),
+    (("ч", "час", "часа", "часов",
+      "h", "hr", "hrs", "hour", "hours"), dt.timedelta(hours=1)),
+    (("д", "день", "дня", "дней",
+      "d", "day", "days"), dt.timedelta(days=1)),
+    (("нед", "неделю", "недели", "недель",
+      "w", "week", "weeks"), dt.timedelta(weeks=1)),
+):
+    for _name in _names:
+        _UNITS[_name] = _delta
+
+
+def _alternation(words) -> str:
+    # длинные варианты первыми, чтобы «пятницу» не съедалось как «пт…»
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# время с обязательными минутами: 14:30, в 9:05, at 7:15pm
+_CLOCK = r"(?:(?:в|at)\s+)?(?P<hh>\d{1,2}):(?P<mm>\d{2})(?:\s*(?P<ampm>am|pm))?"
+# после дня минуты можно опустить: «завтра в 9», «fri 6pm»
+_CLOCK_LOOSE = r"(?:(?:в|at)\s+)?(?P<hh>\d{1,2})(?::(?P<mm>\d{2}))?(?:\s*(?P<ampm>am|pm))?"
+
+_REL_RE = re.compile(
+    r"(?:через|in)\s+(?:(?P<n>\d{1,4})\s*|(?:an?|one)\s+)?(?P<unit>[a-zа-яё]+)",
+    re.IGNORECASE,
+)
+_ISO_RE = re.compile(
+    rf"(?P<y>\d{{4}})-(?P<mo>\d{{1,2}})-(?P<d>\d{{1,2}})(?:(?:\s+|t){_CLOCK})?",
+    re.IGNORECASE,
+)
+_DMY_RE = re.compile(
+    rf"(?P<d>\d{{1,2}})\.(?P<mo>\d{{1,2}})(?:\.(?P<y>\d{{4}}|\d{{2}}))?(?:\s+{_CLOCK})?",
+    re.IGNORECASE,
+)
+_DAY_RE = re.compile(
+    rf"(?:(?P<prep>в|во|on|до|ко|к|by)\s+)?(?P<day>{_alternation([*_RELATIVE_DAYS, *_WEEKDAYS])})"
+    rf"(?:\s+{_CLOCK_LOOSE})?",
+    re.IGNORECASE,
+)
+_TIME_RE = re.compile(_CLOCK, re.IGNORECASE)
+
+_WORD_RE = re.compile(r"\S+")
+
+# слово из цифр и разделителей: «01.11», «3.12», «2026-11-01»
+_NUMERIC_RE = re.compile(r"[\d.,/\-]+")
+# предлог срока, оставшийся в конце текста задачи: «Сделать к 18:00»
+_TRAILING_PREP_RE = re.compile(r"\s+(?:в|во|к|ко|до|at|on|by)$", re.IGNORECASE)
+# явное отделение срока от текста: «Позвонить маме, в субботу»
+_SEPARATORS = ",;:—–-"
+# маркеры срока перед днём недели: «до пятницы», «к понедельнику»
+_DEADLINE_PREPS = {"до", "к", "ко", "by"}
+
+
+def _clock(m: "re.Match[str]", default: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    hh = m.group("hh")
+    if hh is None:
+        return default
+    hour = int(hh)
+    minute = int(m.group("mm") or 0)
+    ampm = m.group("ampm")
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        ampm = ampm.lower()
+        if ampm == "pm" and hour != 12:
+            hour += 12
+        elif ampm == "am" and hour == 12:
+            hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _at(day: dt.datetime, hm: Tuple[int, int]) -> dt.datetime:
+    return day.replace(hour=hm[0], minute=hm[1], second=0, microsecond=0)
+
+
+def _parse_local(text: str, now: dt.datetime) -> Optional[dt.datetime]:
+    """
+    Текст -> наивное ЛОКАЛЬНОЕ время пользователя (now — тоже локальное).
+    """
+    m = _REL_RE.fullmatch(text)
+    if m:
+        unit = _UNITS.get(m.group("unit").lower())
+        if unit is None:
+            return None
+        n = int(m.group("n") or 1)
+        return (now + unit * n).replace(second=0, microsecond=0)
+
+    m = _ISO_RE.fullmatch(text)
+    if m:
+        hm = _clock(m, DEFAULT_TIME)
+        if hm is None:
+            return None
+        try:
+            return dt.datetime(int(m.group("y")), int(m.group("mo")), int(m.group("d")), *hm)
+        except ValueError:
+            return None
+
+    m = _DMY_RE.fullmatch(text)
+    if m:
+        hm = _clock(m, DEFAULT_TIME)
+        if hm is None:
+            return None
+        y = m.group("y")
+        year = now.year if y is None else int(y) + (2000 if len(y) == 2 else 0)
+        try:
+            local = dt.datetime(year, int(m.group("mo")), int(m.group("d")), *hm)
+            # год не указан и дата уже прошла — значит, следующий год
+            if y is None and local <= now:
+                local = local.replace(year=year + 1)
+        except ValueError:
+            return None
+        return local
+
+    m = _DAY_RE.fullmatch(text)
+    if m:
+        hm = _clock(m, DEFAULT_TIME)
+        if hm is None:
+            return None
+        word = m.group("day").lower()
+        if word in _RELATIVE_DAYS:
+            return _at(now + dt.timedelta(days=_RELATIVE_DAYS[word]), hm)
+        ahead = (_WEEKDAYS[word] - now.weekday()) % 7
+        local = _at(now + dt.timedelta(days=ahead), hm)
+        # «пт 18:00» в пятницу после 18:00 — следующая пятница
+        if local <= now:
+            local += dt.timedelta(weeks=1)
+        return local
+
+    m = _TIME_RE.fullmatch(text)
+    if m:
+        hm = _clock(m, DEFAULT_TIME)
+        if hm is None:
+            return None
+        local = _at(now, hm)
+        # время сегодня уже прошло — значит, завтра
+        if local <= now:
+            local += dt.timedelta(days=1)
+        return local
+
+    return None
+
+
+def parse_deadline(
+    text: str,
+    now: dt.datetime,
+    offset_minutes: int,
+) -> Optional[dt.datetime]:
+    """
+    Срок из текста -> aware datetime в UTC или None, если текст не распознан.
+    now — текущее время (aware или наивное UTC),
+    offset_minutes — смещение пользователя (local = UTC - offset).
+    """
+    if now.tzinfo is not None:
+        now = now.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    offset = dt.timedelta(minutes=int(offset_minutes or 0))
+
+    local = _parse_local(text.strip(), now - offset)
+    if local is None:
+        return None
+    return (local + offset).replace(tzinfo=dt.timezone.utc)
+
+
+def _is_tail_deadline(tail: str, head: str) -> bool:
+    """
+    Хвост текста задачи — срок, а не часть названия.
+    Без явного разделителя режутся только однозначные формы:
+    «через/in N …», «сегодня/завтра…», время с минутами
+    и день недели со временем или после «до»/«к». Просто день недели
+    («Понедельник начинается в субботу») и даты цифрами («python 3.12»,
+    «глава 10.5») без разделителя остаются в тексте.
+    """
+    separated = head.rstrip().endswith(tuple(_SEPARATORS))
+    if _REL_RE.fullmatch(tail):
+        return True
+    m = _DAY_RE.fullmatch(tail)
+    if m:
+        if separated or m.group("hh") is not None:
+            return True
+        prep = (m.group("prep") or "").lower()
+        return m.group("day").lower() in _RELATIVE_DAYS or prep in _DEADLINE_PREPS
+    if _TIME_RE.fullmatch(tail):
+        if separated or not tail[0].isdigit():
+            return True
+        # «Сдать 01.11 14:30»: время относится к дате цифрами — не режем
+        words = head.split()
+        return not (words and _NUMERIC_RE.fullmatch(words[-1]))
+    return False
+
+
+def split_deadline(
+    text: str,
+    now: dt.datetime,
+    offset_minutes: int,
+) -> Tuple[str, Optional[dt.datetime]]:
+    """
+    Отделить срок, дописанный в конец текста задачи:
+    «Купить молоко завтра 9:00» -> («Купить молоко», <UTC>).
+    Берётся самый длинный хвост из будущего, который _is_tail_deadline
+    считает сроком; предлог перед ним уходит вместе со сроком.
+    Если такого нет — (text, None), срок пользователь вводит отдельно.
+    """
+    starts = [m.start() for m in _WORD_RE.finditer(text)]
+    now_utc = now if now.tzinfo is not None else now.replace(tzinfo=dt.timezone.utc)
+
+    # хотя бы одно слово должно остаться на сам текст задачи
+    for n in range(min(MAX_TAIL_WORDS, len(starts) - 1), 0, -1):
+        cut = starts[-n]
+        tail = text[cut:].strip()
+        if not _is_tail_deadline(tail, text[:cut]):
+            continue
+        due = parse_deadline(tail, now, offset_minutes)
+        if due is not None and due > now_utc:
+            head = _TRAILING_PREP_RE.sub("", text[:cut].rstrip())
+            head = head.rstrip(" \t" + _SEPARATORS)
+            if head:
+                return head, due
+    return text, None
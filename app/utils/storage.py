@@ -1,9 +1,18 @@
 # app/utils/storage.py
 
 import datetime as dt
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from app.db.core import get_pool
+from app.db.core import acquire
+
+
+# канал NOTIFY: ui_state пользователя сброшен из другого процесса (нотифаер)
+UI_STATE_RESET_CHANNEL = "ui_state_reset"
+# канал NOTIFY: ui_state записан пачкой одной из реплик бота;
+# payload — "<origin>|chat:user,chat:user,..."
+UI_STATE_CHANGED_CHANNEL = "ui_state_changed"
+# ключей в одном уведомлении (payload NOTIFY ограничен 8000 байт)
+_NOTIFY_KEYS_PER_PAYLOAD = 200
 
 
 def _now_utc() -> dt.datetime:
@@ -39,8 +48,7 @@ async def _next_task_id(user_id: int) -> int:
     """
     Возвращает следующий task_id для пользователя (max+1).
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         row = await conn.fetchrow(
             "SELECT COALESCE(MAX(task_id) + 1, 1) AS next_id "
             "FROM task_state WHERE user_id = $1",
@@ -59,8 +67,7 @@ async def add_task(user_id: int, text: str) -> Dict[str, Any]:
     task_id = await _next_task_id(user_id)
     now = _now_utc()
 
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         await conn.execute(
             """
             INSERT INTO task_state (user_id, task_id, text, is_done, created_at, due_at)
@@ -85,8 +92,7 @@ async def list_user_tasks(user_id: int) -> List[Dict[str, Any]]:
     """
     Возвращает список задач пользователя из Postgres.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         rows = await conn.fetch(
             """
             SELECT task_id, text, is_done, created_at, due_at
@@ -115,8 +121,7 @@ async def get_task(task_id: int, user_id: int) -> Optional[Dict[str, Any]]:
     """
     Одна задача по user_id + task_id (id).
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         row = await conn.fetchrow(
             """
             SELECT task_id, text, is_done, created_at, due_at
@@ -157,8 +162,7 @@ async def update_task(
       - None (передано явно) -> чистим дедлайн
       - _sentinel (по умолчанию) -> поле не трогаем
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         row = await conn.fetchrow(
             """
             SELECT user_id, task_id
@@ -219,8 +223,7 @@ async def delete_task(task_id: int, user_id: int) -> bool:
     """
     Удаляет задачу из Postgres.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         result = await conn.execute(
             """
             DELETE FROM task_state
@@ -232,6 +235,26 @@ async def delete_task(task_id: int, user_id: int) -> bool:
     return result.endswith("DELETE 1")
 
 
+async def delete_tasks(user_id: int, task_ids: List[int]) -> int:
+    """
+    Удаляет несколько задач пользователя одним запросом.
+    Возвращает число удалённых.
+    """
+    if not task_ids:
+        return 0
+    async with acquire() as conn:
+        result = await conn.execute(
+            """
+            DELETE FROM task_state
+            WHERE user_id = $1 AND task_id = ANY($2::int[])
+            """,
+            user_id,
+            list(task_ids),
+        )
+    # "DELETE <n>"
+    return int(result.split()[-1])
+
+
 async def set_due(task_id: int, user_id: int, due_iso: Optional[str]) -> bool:
     """
     Враппер для установки дедлайна по ISO-строке.
@@ -254,14 +277,16 @@ async def list_due_tasks(until: dt.datetime) -> List[Dict[str, Any]]:
     Параметр `until` сейчас не используется как фильтр,
     из-за небольшого масштаба просто выбираем все due != NULL,
     а реальную проверку окна делает is_due_now().
+    Пользователи с флагом is_unreachable (заблокировали бота) пропускаются.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         rows = await conn.fetch(
             """
-            SELECT user_id, task_id, text, due_at
-            FROM task_state
-            WHERE due_at IS NOT NULL
+            SELECT t.user_id, t.task_id, t.text, t.due_at
+            FROM task_state t
+            LEFT JOIN user_settings us ON us.user_id = t.user_id
+            WHERE t.due_at IS NOT NULL
+              AND NOT COALESCE(us.is_unreachable, FALSE)
             """,
         )
 
@@ -278,6 +303,102 @@ async def list_due_tasks(until: dt.datetime) -> List[Dict[str, Any]]:
     return result
 
 
+# сколько часов после digest_hour сводку ещё можно догнать (простой нотифаера,
+# повтор после ошибки); позже — ждём следующего дня, а не шлём её вечером
+DIGEST_CATCH_UP_HOURS = 2
+
+
+async def claim_daily_digests(
+    now: dt.datetime,
+    catch_up_hours: int = DIGEST_CATCH_UP_HOURS,
+) -> List[Dict[str, Any]]:
+    """
+    Один set-based запрос для ежедневной сводки.
+
+    Выбирает пользователей, у которых включена сводка, локальный час
+    в окне [digest_hour, digest_hour + catch_up_hours)
+    и сводка за текущий локальный день ещё не отправлялась,
+    сразу помечает их (digest_sent_on = локальная дата) и возвращает
+    их невыполненные задачи с дедлайном до конца локального дня
+    (просроченные + на сегодня). Пометка делается до отправки, поэтому
+    параллельные нотифаеры не отправят сводку дважды; неотправленные
+    сводки возвращаются в очередь через release_daily_digests().
+
+    local = UTC - tz_offset_minutes (offset = server - user).
+    """
+    async with acquire() as conn:
+        rows = await conn.fetch(
+            """
+            WITH eligible AS (
+                SELECT user_id,
+                       ($1::timestamptz AT TIME ZONE 'UTC')
+                           - make_interval(mins => tz_offset_minutes) AS local_now
+                FROM user_settings
+                WHERE digest_hour IS NOT NULL
+                  AND NOT is_unreachable
+            ),
+            claimed AS (
+                UPDATE user_settings us
+                SET digest_sent_on = e.local_now::date
+                FROM eligible e
+                WHERE us.user_id = e.user_id
+                  AND EXTRACT(HOUR FROM e.local_now) >= us.digest_hour
+                  AND EXTRACT(HOUR FROM e.local_now) < us.digest_hour + $2
+                  AND (us.digest_sent_on IS NULL
+                       OR us.digest_sent_on < e.local_now::date)
+                RETURNING us.user_id, us.tz_offset_minutes, e.local_now
+            )
+            SELECT c.user_id, c.tz_offset_minutes,
+                   t.task_id, t.text, t.due_at,
+                   t.due_at < $1::timestamptz AS is_overdue
+            FROM claimed c
+            JOIN task_state t ON t.user_id = c.user_id
+            WHERE NOT t.is_done
+              AND t.due_at IS NOT NULL
+              AND t.due_at < (
+                  (date_trunc('day', c.local_now) + INTERVAL '1 day'
+                   + make_interval(mins => c.tz_offset_minutes))
+                  AT TIME ZONE 'UTC'
+              )
+            ORDER BY c.user_id, t.due_at, t.task_id
+            """,
+            now,
+            catch_up_hours,
+        )
+
+    result: List[Dict[str, Any]] = []
+    for r in rows:
+        result.append(
+            {
+                "user_id": int(r["user_id"]),
+                "tz_offset_minutes": int(r["tz_offset_minutes"] or 0),
+                "id": int(r["task_id"]),
+                "text": str(r["text"] or ""),
+                "due_at": _dt_to_iso(r["due_at"]),
+                "is_overdue": bool(r["is_overdue"]),
+            }
+        )
+    return result
+
+
+async def release_daily_digests(user_ids: List[int]) -> None:
+    """
+    Снимает пометку claim_daily_digests() с пользователей, которым
+    сводку отправить не удалось: следующий проход нотифаера попробует снова.
+    """
+    if not user_ids:
+        return
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE user_settings
+            SET digest_sent_on = NULL
+            WHERE user_id = ANY($1::bigint[])
+            """,
+            list(user_ids),
+        )
+
+
 async def clear_task_due(user_id: int, task_id: int) -> None:
     """
     Сбрасывает дедлайн у задачи.
@@ -288,8 +409,7 @@ async def get_ui_message_id(chat_id: int, user_id: int) -> Optional[int]:
     Возвращает message_id последнего экранного сообщения для пары (user_id, chat_id),
     либо None, если его ещё нет.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         row = await conn.fetchrow(
             """
             SELECT message_id
@@ -306,8 +426,7 @@ async def save_ui_message_id(chat_id: int, user_id: int, message_id: int) -> Non
     """
     Сохраняет/обновляет message_id экранного сообщения для (user_id, chat_id).
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         await conn.execute(
             """
             INSERT INTO ui_state (user_id, chat_id, message_id)
@@ -324,9 +443,10 @@ async def save_ui_message_id(chat_id: int, user_id: int, message_id: int) -> Non
 async def delete_ui_message_id(chat_id: int, user_id: int) -> None:
     """
     Удаляет запись об экранном сообщении (если понадобится явно чистить).
+    Шлёт NOTIFY, чтобы кэш ui_state в процессе бота тоже забыл этот id
+    (нотифаер может работать отдельным процессом).
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         await conn.execute(
             """
             DELETE FROM ui_state
@@ -335,3 +455,59 @@ async def delete_ui_message_id(chat_id: int, user_id: int) -> None:
             user_id,
             chat_id,
         )
+        await conn.execute(
+            "SELECT pg_notify($1, $2)",
+            UI_STATE_RESET_CHANNEL,
+            f"{chat_id}:{user_id}",
+        )
+
+
+async def flush_ui_state(
+    upserts: Iterable[Tuple[int, int, int]],
+    deletes: Iterable[Tuple[int, int]],
+    origin: str = "",
+) -> None:
+    """
+    Пакетная запись ui_state из write-behind кэша (app.utils.ui_cache):
+      upserts — (chat_id, user_id, message_id),
+      deletes — (chat_id, user_id).
+    Всё одной транзакцией, по одному запросу на вид операции.
+    Изменённые ключи рассылаются в UI_STATE_CHANGED_CHANNEL от имени
+    origin, чтобы другие реплики выбросили их из своих кэшей.
+    """
+    upserts = list(upserts)
+    deletes = list(deletes)
+    if not upserts and not deletes:
+        return
+
+    async with acquire() as conn:
+        async with conn.transaction():
+            if upserts:
+                await conn.execute(
+                    """
+                    INSERT INTO ui_state (user_id, chat_id, message_id)
+                    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::bigint[])
+                    ON CONFLICT (user_id, chat_id) DO UPDATE
+                    SET message_id = EXCLUDED.message_id
+                    """,
+                    [u for _, u, _ in upserts],
+                    [c for c, _, _ in upserts],
+                    [m for _, _, m in upserts],
+                )
+            if deletes:
+                await conn.execute(
+                    """
+                    DELETE FROM ui_state s
+                    USING unnest($1::bigint[], $2::bigint[]) AS k(user_id, chat_id)
+                    WHERE s.user_id = k.user_id AND s.chat_id = k.chat_id
+                    """,
+                    [u for _, u in deletes],
+                    [c for c, _ in deletes],
+                )
+            keys = [f"{c}:{u}" for c, u, _ in upserts] + [f"{c}:{u}" for c, u in deletes]
+            for i in range(0, len(keys), _NOTIFY_KEYS_PER_PAYLOAD):
+                await conn.execute(
+                    "SELECT pg_notify($1, $2)",
+                    UI_STATE_CHANGED_CHANNEL,
+                    f"{origin}|" + ",".join(keys[i:i + _NOTIFY_KEYS_PER_PAYLOAD]),
+                )
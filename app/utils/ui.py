@@ -1,11 +1,37 @@
 # app/utils/ui.py
-from typing import Optional, Union
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
 
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
-from app.utils import storage
+from app.utils import ui_cache
+from app.utils.update_context import answer_callback
+from app.db.core import mark_user_unreachable
+
+logger = logging.getLogger(__name__)
+
+
+async def _mark_unreachable(user_id: int) -> None:
+    try:
+        await mark_user_unreachable(user_id)
+    except Exception:
+        # флаг — оптимизация, ошибка БД не должна ломать экран
+        pass
+
+
+def _markup_hash(reply_markup) -> int:
+    if reply_markup is None:
+        return 0
+    return hash(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _is_not_modified(exc: TelegramBadRequest) -> bool:
+    return "message is not modified" in str(exc)
 
 
 async def _resolve_chat_user(
@@ -22,6 +48,89 @@ async def _resolve_chat_user(
     return bot, chat_id, user_id
 
 
+# ---------- склейка частых рендеров в одном чате ----------
+
+# после рендера следующий в том же чате ждёт это окно (сек),
+# и из накопившихся за это время экранов рисуется только последний
+DEFAULT_RENDER_WINDOW = 0.15
+_render_window = DEFAULT_RENDER_WINDOW
+
+
+def set_render_window(seconds: float) -> None:
+    global _render_window
+    _render_window = max(0.0, seconds)
+
+
+class _RenderSlot:
+    __slots__ = ("lock", "latest", "waiters")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.latest = 0  # номер последнего запрошенного рендера
+        self.waiters = 0
+
+
+_render_slots: Dict[int, _RenderSlot] = {}
+_render_seq = 0
+
+# время последнего рендера по чатам переживает слот: UserLaneMiddleware
+# пускает апдейты пользователя по одному, и к следующему рендеру слот
+# уже удалён. Порядок — по времени, записи старше окна не нужны.
+LAST_RENDER_MAX = 10_000
+_last_render_at: "OrderedDict[int, float]" = OrderedDict()
+
+
+def _remember_render(chat_id: int, now: float) -> None:
+    _last_render_at[chat_id] = now
+    _last_render_at.move_to_end(chat_id)
+    expired = now - _render_window
+    while _last_render_at and (
+        len(_last_render_at) > LAST_RENDER_MAX
+        or next(iter(_last_render_at.values())) < expired
+    ):
+        _last_render_at.popitem(last=False)
+
+
+async def _render_coalesced(
+    bot: Bot,
+    chat_id: int,
+    user_id: int,
+    text: str,
+    reply_markup,
+) -> None:
+    """
+    Рендеры одного чата выполняются строго по очереди; если пока ждали
+    очереди пришёл более новый экран — этот пропускаем.
+    Рендер идёт в задаче самого хендлера, а не в фоне.
+    """
+    global _render_seq
+    _render_seq += 1
+    seq = _render_seq
+
+    slot = _render_slots.get(chat_id)
+    if slot is None:
+        slot = _render_slots[chat_id] = _RenderSlot()
+    slot.latest = seq
+    slot.waiters += 1
+    try:
+        async with slot.lock:
+            if slot.latest != seq:
+                return
+            wait = _last_render_at.get(chat_id, 0.0) + _render_window - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                if slot.latest != seq:
+                    return
+            try:
+                await _render(bot, chat_id, user_id, text, reply_markup)
+            finally:
+                _remember_render(chat_id, time.monotonic())
+    finally:
+        slot.waiters -= 1
+        if slot.waiters == 0 and _render_slots.get(chat_id) is slot:
+            del _render_slots[chat_id]
+
+
 async def show_screen(
     event: Message | CallbackQuery,
     text: str,
@@ -31,10 +140,14 @@ async def show_screen(
     Универсальный экран бота.
     Логика:
       - если есть сохранённый message_id в ui_state -> пытаемся отредактировать его;
+      - если текст и клавиатура совпадают с последним рендером -> ничего не шлём;
+      - если изменилась только клавиатура -> edit_message_reply_markup;
       - если редактирование не удалось или id нет -> отправляем новое сообщение и сохраняем id.
+    Частые рендеры одного чата склеиваются: рисуется только последний экран.
     """
     if isinstance(event, CallbackQuery):
-        await event.answer()
+        # no-op, если хендлер уже ответил на callback
+        await answer_callback(event)
         message = event.message
         bot: Bot = event.message.bot
         chat_id = message.chat.id
@@ -45,19 +158,47 @@ async def show_screen(
         chat_id = message.chat.id
         user_id = message.from_user.id
 
-    msg_id = await storage.get_ui_message_id(chat_id, user_id)
+    await _render_coalesced(bot, chat_id, user_id, text, reply_markup)
+
+
+async def _render(
+    bot: Bot,
+    chat_id: int,
+    user_id: int,
+    text: str,
+    reply_markup,
+) -> None:
+    msg_id = await ui_cache.get_message_id(chat_id, user_id)
+    text_hash = hash(text)
+    markup_hash = _markup_hash(reply_markup)
 
     # Пытаемся отредактировать существующий экран
     if msg_id is not None:
+        last = ui_cache.get_fingerprint(chat_id, user_id, msg_id)
+        if last == (text_hash, markup_hash):
+            # на экране уже ровно это — Telegram всё равно ответил бы "not modified"
+            return
         try:
-            await bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=msg_id,
-                text=text,
-                reply_markup=reply_markup,
-            )
+            if last is not None and last[0] == text_hash:
+                await bot.edit_message_reply_markup(
+                    chat_id=chat_id,
+                    message_id=msg_id,
+                    reply_markup=reply_markup,
+                )
+            else:
+                await bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=msg_id,
+                    text=text,
+                    reply_markup=reply_markup,
+                )
+            ui_cache.set_fingerprint(chat_id, user_id, msg_id, text_hash, markup_hash)
             return
-        except TelegramBadRequest:
+        except TelegramBadRequest as e:
+            if _is_not_modified(e):
+                # экран уже такой (например, после рестарта) — id валиден
+                ui_cache.set_fingerprint(chat_id, user_id, msg_id, text_hash, markup_hash)
+                return
             # сообщение не найдено / не редактируемо -> считаем, что id устарел
             msg_id = None
         except Exception:
@@ -71,15 +212,17 @@ async def show_screen(
             text=text,
             reply_markup=reply_markup,
         )
+    except TelegramForbiddenError:
+        # пользователь заблокировал бота — больше не пытаемся ему писать
+        await _mark_unreachable(user_id)
+        return
     except Exception:
         # если даже отправка экрана не удалась, дальше делать нечего
         return
 
-    try:
-        await storage.save_ui_message_id(chat_id, user_id, sent.message_id)
-    except Exception:
-        # если не смогли сохранить id, просто живём без него
-        pass
+    # в БД id уйдёт фоном, пачкой (см. app.utils.ui_cache)
+    ui_cache.set_message_id(chat_id, user_id, sent.message_id)
+    ui_cache.set_fingerprint(chat_id, user_id, sent.message_id, text_hash, markup_hash)
 
 
 
@@ -88,14 +231,22 @@ async def show_notification(
     chat_id: int,
     user_id: int,
     text: str,
-) -> None:
+) -> bool:
     """
     Уведомление от нотифаера:
     - ВСЕГДА отправляем отдельное сообщение,
     - ui_state не трогаем вообще.
+    Возвращает True, если сообщение отправлено.
+    Если бот заблокирован (TelegramForbiddenError) — помечаем пользователя
+    недоступным и пробрасываем ошибку, чтобы нотифаер пропустил его задачи.
     """
     try:
         await bot.send_message(chat_id=chat_id, text=text)
+    except TelegramForbiddenError:
+        await _mark_unreachable(user_id)
+        raise
     except Exception:
-        # уведомление не критично — просто глушим ошибку
-        pass
\ No newline at end of file
+        # уведомление не критично — не роняем вызывающего, но причину пишем в лог
+        logger.warning("UI: не удалось отправить уведомление chat=%s", chat_id, exc_info=True)
+        return False
+    return True
\ No newline at end of file
@@ -0,0 +1,230 @@
+# app/utils/ui_cache.py
+"""
+In-process кэш ui_state: (chat_id, user_id) -> message_id экранного сообщения.
+
+- чтение — из памяти, при промахе один раз подгружаем из Postgres;
+- запись/удаление — сразу в памяти, в БД уходят пачкой в фоне (write-behind);
+- если ui_state сбросил другой процесс (нотифаер), приходит NOTIFY
+  и кэш забывает id;
+- если ui_state записала другая реплика бота (webhook за балансировщиком),
+  её пачка приходит NOTIFY и эти ключи перечитываются из БД при следующем
+  обращении. Окно рассинхрона — не больше интервала записи;
+- после обрыва соединения LISTEN уведомления могли потеряться —
+  кэш сбрасывается целиком (кроме несохранённого своего).
+"""
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.db.core import listen
+from app.utils import storage
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, int]  # (chat_id, user_id)
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_ENTRIES = 100_000
+
+# None в значении — известно, что экрана нет
+_cache: "OrderedDict[Key, Optional[int]]" = OrderedDict()
+# ещё не записанные изменения; None — удалить запись
+_dirty: Dict[Key, Optional[int]] = {}
+# отпечаток последнего отрисованного экрана: (message_id, hash текста, hash клавиатуры);
+# только в памяти — после рестарта первый рендер просто отредактирует сообщение
+_fingerprints: Dict[Key, Tuple[int, int, int]] = {}
+
+_max_entries = DEFAULT_MAX_ENTRIES
+_flush_interval = DEFAULT_FLUSH_INTERVAL
+_flusher: Optional[asyncio.Task] = None
+_flush_lock = asyncio.Lock()
+# метка процесса в уведомлениях о записи — свои пачки не обрабатываем
+_instance_id = uuid.uuid4().hex[:12]
+
+
+def _remember(key: Key, message_id: Optional[int]) -> None:
+    if _cache.get(key, message_id) != message_id:
+        _fingerprints.pop(key, None)
+    _cache[key] = message_id
+    _cache.move_to_end(key)
+    # вытесняем самые старые записи, кроме ещё не сохранённых
+    while len(_cache) > _max_entries:
+        for old_key in _cache:
+            if old_key not in _dirty:
+                break
+        else:
+            return
+        del _cache[old_key]
+        _fingerprints.pop(old_key, None)
+
+
+async def get_message_id(chat_id: int, user_id: int) -> Optional[int]:
+    """
+    message_id текущего экрана или None.
+    """
+    key = (chat_id, user_id)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    message_id = await storage.get_ui_message_id(chat_id, user_id)
+    # пока ждали БД, значение могли обновить — оно свежее
+    if key not in _cache:
+        _remember(key, message_id)
+    return _cache.get(key, message_id)
+
+
+def set_message_id(chat_id: int, user_id: int, message_id: int) -> None:
+    key = (chat_id, user_id)
+    _dirty[key] = message_id
+    _remember(key, message_id)
+
+
+def forget(chat_id: int, user_id: int) -> None:
+    """
+    Сбросить экран: следующий show_screen отправит новое сообщение.
+    """
+    key = (chat_id, user_id)
+    _dirty[key] = None
+    _remember(key, None)
+
+
+def has(chat_id: int, user_id: int) -> bool:
+    """
+    Известен ли процессу экран чата (в том числе «экрана нет»).
+    """
+    return (chat_id, user_id) in _cache
+
+
+def prime(chat_id: int, user_id: int, message_id: Optional[int]) -> None:
+    """
+    Положить в кэш значение, прочитанное из БД другим запросом.
+    Не перетирает то, что уже известно процессу.
+    """
+    key = (chat_id, user_id)
+    if key not in _cache:
+        _remember(key, message_id)
+
+
+def get_fingerprint(
+    chat_id: int,
+    user_id: int,
+    message_id: int,
+) -> Optional[Tuple[int, int]]:
+    """
+    (hash текста, hash клавиатуры) последнего рендера в message_id или None.
+    """
+    fp = _fingerprints.get((chat_id, user_id))
+    if fp is None or fp[0] != message_id:
+        return None
+    return fp[1], fp[2]
+
+
+def set_fingerprint(
+    chat_id: int,
+    user_id: int,
+    message_id: int,
+    text_hash: int,
+    markup_hash: int,
+) -> None:
+    key = (chat_id, user_id)
+    if _cache.get(key) == message_id:
+        _fingerprints[key] = (message_id, text_hash, markup_hash)
+
+
+async def flush() -> None:
+    """
+    Записать накопленные изменения в БД одной пачкой.
+    """
+    async with _flush_lock:
+        if not _dirty:
+            return
+        batch = dict(_dirty)
+        _dirty.clear()
+
+        upserts = [(c, u, m) for (c, u), m in batch.items() if m is not None]
+        deletes = [key for key, m in batch.items() if m is None]
+        try:
+            await storage.flush_ui_state(upserts, deletes, origin=_instance_id)
+        except BaseException as exc:
+            if not isinstance(exc, asyncio.CancelledError):
+                logger.exception("ui_cache: не удалось сохранить %d записей", len(batch))
+            # возвращаем в очередь то, что не успели перезаписать новыми значениями
+            for key, m in batch.items():
+                _dirty.setdefault(key, m)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(_flush_interval)
+        await flush()
+
+
+def _on_reset(payload: str) -> None:
+    try:
+        chat_id, user_id = (int(x) for x in payload.split(":"))
+    except ValueError:
+        return
+    forget(chat_id, user_id)
+
+
+def _on_changed(payload: str) -> None:
+    origin, _, keys = payload.partition("|")
+    if origin == _instance_id:
+        return
+    for item in keys.split(","):
+        try:
+            chat_id, user_id = (int(x) for x in item.split(":"))
+        except ValueError:
+            continue
+        key = (chat_id, user_id)
+        # несохранённое своё значение новее — его не трогаем
+        if key in _dirty:
+            continue
+        _cache.pop(key, None)
+        _fingerprints.pop(key, None)
+
+
+def _on_reconnect() -> None:
+    # уведомления за время обрыва потеряны — забываем всё, кроме своих
+    # несохранённых значений (они новее БД)
+    for key in [k for k in _cache if k not in _dirty]:
+        del _cache[key]
+        _fingerprints.pop(key, None)
+    logger.info("ui_cache: кэш сброшен после переподключения LISTEN")
+
+
+async def start(
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> None:
+    """
+    Запустить фоновую запись и подписку на сбросы ui_state.
+    Вызывать после init_db_and_schema().
+    """
+    global _flusher, _flush_interval, _max_entries
+    _flush_interval = flush_interval
+    _max_entries = max_entries
+    await listen(storage.UI_STATE_RESET_CHANNEL, _on_reset, on_reconnect=_on_reconnect)
+    await listen(storage.UI_STATE_CHANGED_CHANNEL, _on_changed)
+    if _flusher is None or _flusher.done():
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+async def stop() -> None:
+    """
+    Остановить фоновую запись и сохранить всё, что осталось.
+    """
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    await flush()
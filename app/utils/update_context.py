@@ -0,0 +1,67 @@
+# app/utils/update_context.py
+"""
+Контекст текущего апдейта (через ContextVar):
+  - на какие callback-запросы уже ответили — ровно один answerCallbackQuery;
+  - сколько исходящих вызовов Bot API и обращений к БД сделал апдейт
+    и сколько времени на них ушло;
+  - какой хендлер его обработал.
+
+Контекст открывает UpdateContextMiddleware (app.middlewares.update_context),
+вызовы API считает сессионный ApiCallCounterMiddleware,
+обращения к БД — app.db.core.acquire(), хендлер отмечает
+HandlerNameMiddleware (или CallbackRouter для своих маршрутов).
+"""
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiogram.types import CallbackQuery
+
+
+@dataclass
+class UpdateStats:
+    api_calls: int = 0
+    api_seconds: float = 0.0
+    api_methods: Counter = field(default_factory=Counter)
+    db_calls: int = 0
+    db_seconds: float = 0.0  # включая ожидание соединения в пуле
+    handler: str = ""
+    answered: set = field(default_factory=set)  # id отвеченных callback-запросов
+
+
+_current: ContextVar[Optional[UpdateStats]] = ContextVar("update_stats", default=None)
+
+
+def current_stats() -> Optional[UpdateStats]:
+    return _current.get()
+
+
+def begin_update():
+    return _current.set(UpdateStats())
+
+
+def end_update(token) -> None:
+    _current.reset(token)
+
+
+async def answer_callback(
+    query: CallbackQuery,
+    text: Optional[str] = None,
+    show_alert: bool = False,
+) -> None:
+    """
+    Ответ на callback-запрос, не больше одного раза за апдейт.
+    Звать как можно раньше, до работы с БД; повторные вызовы
+    (в том числе из show_screen) ничего не отправляют.
+    """
+    stats = _current.get()
+    if stats is not None:
+        if query.id in stats.answered:
+            return
+        stats.answered.add(query.id)
+    try:
+        await query.answer(text=text, show_alert=show_alert)
+    except Exception:
+        # запрос мог устареть — экрану это не мешает
+        pass
@@ -0,0 +1,152 @@
+# app/utils/user_context.py
+"""
+Данные пользователя, загружаемые не чаще раза на апдейт
+(UserContextMiddleware, app.middlewares.user_context).
+
+Middleware только запоминает, чей это апдейт; запрос в БД делает
+первый хелпер, которому что-то понадобилось (get_tz_offset и т.п.).
+Апдейты, которым настройки не нужны (листание пикера дат), в БД
+за ними не ходят вовсе. Вне апдейта (нотифаер, веб) хелперы
+просто читают из БД.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from app.db.core import (
+    clear_user_unreachable,
+    get_or_create_web_token,
+    get_user_digest_hour,
+    get_user_tz_offset,
+    load_user_context,
+)
+from app.utils import ui_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UserContext:
+    user_id: int
+    chat_id: int
+    tz_offset_minutes: Optional[int]  # None — пользователь ещё не настраивал время
+    web_token: Optional[str]
+    digest_hour: Optional[int]
+    ui_message_id: Optional[int]
+
+    @classmethod
+    def from_row(cls, user_id: int, chat_id: int, row: Dict[str, Any]) -> "UserContext":
+        return cls(
+            user_id=user_id,
+            chat_id=chat_id,
+            tz_offset_minutes=row["tz_offset_minutes"],
+            web_token=row["web_token"],
+            digest_hour=row["digest_hour"],
+            ui_message_id=row["message_id"],
+        )
+
+
+@dataclass
+class _Binding:
+    """
+    Чей апдейт обрабатывается и, после первого обращения, его UserContext.
+    failed — загрузить не удалось, хелперы идут в БД по одному значению.
+    """
+    user_id: int
+    chat_id: int
+    ctx: Optional[UserContext] = None
+    failed: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+_current: ContextVar[Optional[_Binding]] = ContextVar("user_context", default=None)
+
+
+async def _load(binding: _Binding) -> None:
+    user_id, chat_id = binding.user_id, binding.chat_id
+    # экран чата уже в ui_cache — ui_state не читаем
+    with_ui = not ui_cache.has(chat_id, user_id)
+    try:
+        row = await load_user_context(user_id, chat_id, with_ui=with_ui)
+    except Exception:
+        logger.exception("Не удалось загрузить контекст user=%s", user_id)
+        binding.failed = True
+        return
+
+    binding.ctx = UserContext.from_row(user_id, chat_id, row)
+    if with_ui:
+        ui_cache.prime(chat_id, user_id, binding.ctx.ui_message_id)
+    if row["is_unreachable"]:
+        try:
+            await clear_user_unreachable(user_id)
+        except Exception:
+            logger.exception("Не удалось снять флаг недоступности user=%s", user_id)
+
+
+async def current_user_ctx(user_id: int) -> Optional[UserContext]:
+    """
+    UserContext текущего апдейта; при первом обращении грузится из БД.
+    None — вне апдейта этого пользователя или БД недоступна.
+    """
+    binding = _current.get()
+    if binding is None or binding.user_id != user_id:
+        return None
+    if binding.ctx is None and not binding.failed:
+        async with binding.lock:
+            if binding.ctx is None and not binding.failed:
+                await _load(binding)
+    return binding.ctx
+
+
+def bind(user_id: int, chat_id: int):
+    return _current.set(_Binding(user_id, chat_id))
+
+
+def unbind(token) -> None:
+    _current.reset(token)
+
+
+async def get_tz_offset(user_id: int) -> Optional[int]:
+    """
+    Как db.core.get_user_tz_offset, но без запроса внутри апдейта.
+    """
+    ctx = await current_user_ctx(user_id)
+    if ctx is not None:
+        return ctx.tz_offset_minutes
+    return await get_user_tz_offset(user_id)
+
+
+async def get_web_token(user_id: int) -> str:
+    """
+    Как db.core.get_or_create_web_token; созданный токен запоминается
+    до конца апдейта.
+    """
+    ctx = await current_user_ctx(user_id)
+    if ctx is not None and ctx.web_token:
+        return ctx.web_token
+    token = await get_or_create_web_token(user_id)
+    remember(user_id, web_token=token)
+    return token
+
+
+async def get_digest_hour(user_id: int) -> Optional[int]:
+    ctx = await current_user_ctx(user_id)
+    if ctx is not None:
+        return ctx.digest_hour
+    return await get_user_digest_hour(user_id)
+
+
+def remember(user_id: int, **changes: Any) -> None:
+    """
+    Настройки изменены хендлером — дальше в этом апдейте новые значения:
+    remember(uid, tz_offset_minutes=180), remember(uid, web_token=...).
+    """
+    binding = _current.get()
+    if binding is None or binding.user_id != user_id or binding.ctx is None:
+        # контекст ещё не загружен — загрузка прочитает уже новые значения
+        return
+    ctx = binding.ctx
+    for name, value in changes.items():
+        setattr(ctx, name, value)
@@ -0,0 +1 @@
+# init-файл пакета benchmarks
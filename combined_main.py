@@ -0,0 +1,61 @@
+# combined_main.py
+"""
+Бот, нотифаер и веб-приложение в одном процессе: python -m combined_main
+
+Для небольших серверов: один event loop, один пул Postgres и одни
+кэши на всех, вместо отдельных main.py и app/web_python/main.py.
+Веб слушает WEB_HOST:WEB_PORT, бот — long polling или webhook,
+как в main.py; нотифаер — по NOTIFIER_IN_BOT.
+"""
+import asyncio
+import logging
+
+from config.config import load_config, Config
+from app.services.lifecycle import Lifecycle
+from app.services.web_server import create_web_server
+from main import run_bot, setup
+
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    config: Config = load_config()
+
+    logging.basicConfig(
+        level=logging.getLevelName(config.log.level),
+        format=config.log.format,
+    )
+    logger.info("Starting bot + web")
+
+    # сигналы ловит lifecycle: и aiogram, и uvicorn иначе ставят свои обработчики
+    lifecycle = Lifecycle(timeout=config.updates.shutdown_timeout)
+    lifecycle.install_signal_handlers()
+
+    # пул поднимается здесь, startup веб-приложения его переиспользует
+    await setup(config, lifecycle)
+    server = create_web_server(config.web.host, config.web.port)
+
+    async def stop_web() -> None:
+        # uvicorn перестаёт принимать соединения и дожидается текущих запросов
+        server.should_exit = True
+
+    lifecycle.on_stop_intake("web", stop_web)
+
+    async def intake() -> None:
+        tasks = [
+            asyncio.create_task(run_bot(config, lifecycle)),
+            asyncio.create_task(server.serve()),
+        ]
+        # остановка (или падение) одной половины останавливает и другую
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        lifecycle.stopping.set()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                raise result
+
+    await lifecycle.serve(intake())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,11 +17,83 @@ class LogSettings:
 @dataclass
 class WebSettings:
     python_base: str
+    host: str  # где слушает веб-приложение при совместном запуске (combined_main)
+    port: int
 
 
 @dataclass
 class DbSettings:
     dsn: str
+    pool_min_size: int
+    pool_max_size: int
+
+
+@dataclass
+class UiSettings:
+    cache_flush_interval: float  # секунды между пакетными записями ui_state
+    cache_max_entries: int
+    render_window: float  # окно склейки частых рендеров одного чата, сек
+
+
+@dataclass
+class NotifierSettings:
+    in_bot_process: bool  # False — нотифаер запущен отдельно (python -m notifier_main)
+    interval_seconds: int
+    pool_min_size: int
+    pool_max_size: int
+    metrics_port: int  # 0 — /metrics отдельного нотифаера выключен
+
+
+@dataclass
+class MetricsSettings:
+    host: str
+    port: int  # 0 — эндпоинт /metrics выключен
+
+
+@dataclass
+class UpdateSettings:
+    lanes: int  # очередей апдейтов (пользователь -> user_id % lanes)
+    max_in_flight: int  # одновременно работающих хендлеров на процесс
+    slow_threshold: float  # апдейт дольше стольких секунд логируется с разбивкой
+    shutdown_timeout: float  # сек на всю остановку: приём, доработка, flush (+ до 1с на закрытие)
+
+
+@dataclass
+class ThrottleSettings:
+    # апдейтов в секунду на пользователя и запас на всплеск; rate 0 — без ограничения
+    message_rate: float
+    message_burst: int
+    callback_rate: float
+    callback_burst: int
+
+
+@dataclass
+class WebhookSettings:
+    url: str  # публичный https-адрес без пути; пусто — long polling
+    path: str
+    secret: str  # X-Telegram-Bot-Api-Secret-Token, обязателен в режиме webhook
+    host: str
+    port: int
+    max_connections: int
+
+
+@dataclass
+class HttpSettings:
+    pool_size: int  # одновременных соединений с Bot API на сессию
+    keepalive_timeout: float  # сек, сколько держать простаивающее соединение
+    request_timeout: float  # сек, таймаут одного вызова Bot API
+    notifier_session: bool  # отдельная сессия (свой пул) для рассылки нотифаера
+    notifier_pool_size: int
+
+
+@dataclass
+class OutboundSettings:
+    # вызовов Bot API в секунду: на процесс и на чат (+ запас на всплеск); 0 — без ограничения.
+    # Бюджет чата ждут только фоновые вызовы, интерактив лишь расходует его
+    global_rate: float
+    global_burst: int
+    chat_rate: float
+    chat_burst: int
 
 
 @dataclass
@@ -30,11 +102,20 @@ class Config:
     log: LogSettings
     web: WebSettings
     db: DbSettings
+    metrics: MetricsSettings
+    notifier: NotifierSettings
+    ui: UiSettings
+    webhook: WebhookSettings
+    updates: UpdateSettings
+    throttle: ThrottleSettings
+    http: HttpSettings
+    outbound: OutboundSettings
 
 
 def load_config(path: str | None = None) -> Config:
     env = Env()
     env.read_env(path)
+    webhook_url = env("WEBHOOK_URL", "").rstrip("/")
 
     return Config(
         bot=TgBot(token=env("BOT_TOKEN")),
@@ -47,8 +128,63 @@ def load_config(path: str | None = None) -> Config:
         ),
         web=WebSettings(
             python_base=env("PYTHON_BASE", "http://127.0.0.1:8001"),
+            host=env("WEB_HOST", "0.0.0.0"),
+            port=env.int("WEB_PORT", 8001),
         ),
         db=DbSettings(
             dsn=env("DATABASE_URL", ""),
+            pool_min_size=env.int("DB_POOL_MIN", 1),
+            pool_max_size=env.int("DB_POOL_MAX", 5),
+        ),
+        metrics=MetricsSettings(
+            host=env("METRICS_HOST", "0.0.0.0"),
+            port=env.int("METRICS_PORT", 0),
+        ),
+        notifier=NotifierSettings(
+            # в режиме webhook реплик может быть несколько — по умолчанию
+            # нотифаер отдельным процессом, иначе напоминания уйдут дублями
+            in_bot_process=env.bool("NOTIFIER_IN_BOT", not webhook_url),
+            interval_seconds=env.int("NOTIFIER_INTERVAL", 30),
+            pool_min_size=env.int("NOTIFIER_DB_POOL_MIN", 1),
+            pool_max_size=env.int("NOTIFIER_DB_POOL_MAX", 3),
+            metrics_port=env.int("NOTIFIER_METRICS_PORT", 0),
+        ),
+        ui=UiSettings(
+            cache_flush_interval=env.float("UI_CACHE_FLUSH_INTERVAL", 1.0),
+            cache_max_entries=env.int("UI_CACHE_MAX_ENTRIES", 100_000),
+            render_window=env.float("UI_RENDER_WINDOW", 0.15),
+        ),
+        webhook=WebhookSettings(
+            url=webhook_url,
+            path=env("WEBHOOK_PATH", "/tg/webhook"),
+            secret=env("WEBHOOK_SECRET", ""),
+            host=env("WEBHOOK_HOST", "0.0.0.0"),
+            port=env.int("WEBHOOK_PORT", 8080),
+            max_connections=env.int("WEBHOOK_MAX_CONNECTIONS", 40),
+        ),
+        updates=UpdateSettings(
+            lanes=env.int("UPDATE_LANES", 1024),
+            max_in_flight=env.int("UPDATE_MAX_IN_FLIGHT", 8),
+            slow_threshold=env.float("SLOW_UPDATE_SECONDS", 1.0),
+            shutdown_timeout=env.float("SHUTDOWN_TIMEOUT", 8.0),
+        ),
+        throttle=ThrottleSettings(
+            message_rate=env.float("THROTTLE_MESSAGE_RATE", 1.0),
+            message_burst=env.int("THROTTLE_MESSAGE_BURST", 5),
+            callback_rate=env.float("THROTTLE_CALLBACK_RATE", 3.0),
+            callback_burst=env.int("THROTTLE_CALLBACK_BURST", 10),
+        ),
+        http=HttpSettings(
+            pool_size=env.int("BOT_HTTP_POOL_SIZE", 100),
+            keepalive_timeout=env.float("BOT_HTTP_KEEPALIVE", 30.0),
+            request_timeout=env.float("BOT_HTTP_TIMEOUT", 60.0),
+            notifier_session=env.bool("NOTIFIER_HTTP_SESSION", True),
+            notifier_pool_size=env.int("NOTIFIER_HTTP_POOL_SIZE", 10),
+        ),
+        outbound=OutboundSettings(
+            global_rate=env.float("OUTBOUND_GLOBAL_RATE", 30.0),
+            global_burst=env.int("OUTBOUND_GLOBAL_BURST", 30),
+            chat_rate=env.float("OUTBOUND_CHAT_RATE", 3.0),
+            chat_burst=env.int("OUTBOUND_CHAT_BURST", 10),
         ),
     )
@@ -2,13 +2,31 @@
 import asyncio
 import logging
 
+from aiogram import Dispatcher
+
 from config.config import load_config, Config
-from app.bot import bot, dp
+from app.bot import bot, dp, fsm_storage, notifier_bot
 from app.handlers.start import start_router
 from app.handlers.todo import todo_router
+from app.middlewares import (
+    ThrottlingMiddleware,
+    UpdateContextMiddleware,
+    UserLaneMiddleware,
+    UserContextMiddleware,
+    ApiCallCounterMiddleware,
+    HandlerNameMiddleware,
+    OutboundSchedulerMiddleware,
+    PickerExitMiddleware,
+)
+from app.services import cleanup
 from app.services.notifier import notifier
+from app.services.cleanup import cleanup_worker
+from app.services.lifecycle import Lifecycle, cancel_task
+from app.services.metrics_server import start_metrics_server
+from app.services.webhook_server import start_webhook_server
 
-from app.db.core import init_db_and_schema
+from app.db.core import init_db_and_schema, close_db
+from app.utils import ui, ui_cache
 
 
 logger = logging.getLogger(__name__)
@@ -16,7 +34,6 @@ logger = logging.getLogger(__name__)
 
 async def main():
     config: Config = load_config()
-    await init_db_and_schema()
 
     logging.basicConfig(
         level=logging.getLevelName(config.log.level),
@@ -24,13 +41,193 @@ async def main():
     )
     logger.info("Starting bot")
 
+    lifecycle = Lifecycle(timeout=config.updates.shutdown_timeout)
+    lifecycle.install_signal_handlers()
+    await setup(config, lifecycle)
+    await lifecycle.serve(run_bot(config, lifecycle))
+
+
+async def setup(config: Config, lifecycle: Lifecycle) -> None:
+    """
+    Пул БД, кэши, middleware, роутеры и фоновые задачи бота
+    (очистка сообщений, нотифаер). Общая часть main() и совместного
+    запуска бота с веб-приложением (combined_main.py).
+
+    Шаги остановки регистрируются в lifecycle в обратном порядке
+    зависимостей: сначала дорабатывают апдейты и нотифаер, потом
+    дописываются очереди, последними закрываются сессии и пул.
+    """
+    await init_db_and_schema(
+        min_size=config.db.pool_min_size,
+        max_size=config.db.pool_max_size,
+    )
+
+    await ui_cache.start(
+        flush_interval=config.ui.cache_flush_interval,
+        max_entries=config.ui.cache_max_entries,
+    )
+    ui.set_render_window(config.ui.render_window)
+    await fsm_storage.start()
+
+    # один планировщик на все сессии: общий лимит Telegram и приоритеты
+    # (экраны -> напоминания -> удаления); он внешний, счётчик API
+    # внутри него видит только сам запрос, без ожидания в очереди
+    outbound = OutboundSchedulerMiddleware(
+        global_rate=config.outbound.global_rate,
+        global_burst=config.outbound.global_burst,
+        chat_rate=config.outbound.chat_rate,
+        chat_burst=config.outbound.chat_burst,
+    )
+    sessions = [bot.session]
+    if notifier_bot is not bot:
+        sessions.append(notifier_bot.session)
+    for session in sessions:
+        session.middleware(outbound)
+        session.middleware(ApiCallCounterMiddleware())
+    updates = install_update_middlewares(dp, config)
+    # не успевшие апдейты отменяются до flush/close: иначе они пишут
+    # в закрытые сессии и держат соединения, которых ждёт close_db()
+    lifecycle.on_drain(
+        "updates", lambda: _drain_updates(updates), on_timeout=updates.cancel_pending
+    )
+
     dp.include_router(start_router)
     dp.include_router(todo_router)
 
-    asyncio.create_task(notifier(bot, interval_seconds=30))
+    if config.metrics.port:
+        metrics_runner = await start_metrics_server(config.metrics.host, config.metrics.port)
+        lifecycle.on_close("metrics", metrics_runner.cleanup)
+
+    # удаление пользовательских сообщений пачками, вне хендлеров
+    cleanup_task = asyncio.create_task(cleanup_worker(bot))
+
+    async def flush_cleanup() -> None:
+        await cancel_task(cleanup_task)
+        await cleanup.flush(bot)
+
+    # при NOTIFIER_IN_BOT=false нотифаер работает отдельным процессом
+    if config.notifier.in_bot_process:
+        if config.webhook.url:
+            logger.warning(
+                "NOTIFIER_IN_BOT=true в режиме webhook: при нескольких репликах "
+                "напоминания уйдут дублями — запускайте нотифаер отдельно"
+            )
+        notifier_task = asyncio.create_task(
+            notifier(
+                notifier_bot,
+                interval_seconds=config.notifier.interval_seconds,
+                stop=lifecycle.stopping,
+            )
+        )
+        # пачка дорабатывает до конца задачи: отправка и сброс дедлайна вместе
+        lifecycle.on_drain("notifier", lambda: notifier_task)
+
+    # ui_state первым: без него после рестарта экраны дублируются;
+    # удаление сообщений идёт с темпом планировщика — последним,
+    # сколько успеет до срока (неудалённые просто останутся в чате)
+    lifecycle.on_flush("ui_cache", ui_cache.stop)
+    lifecycle.on_flush("cleanup", flush_cleanup)
+    lifecycle.on_close("fsm", fsm_storage.close)
+    lifecycle.on_close("bot session", bot.session.close)
+    if notifier_bot is not bot:
+        lifecycle.on_close("notifier session", notifier_bot.session.close)
+    lifecycle.on_close("db", close_db)
+
+
+def install_update_middlewares(dispatcher: Dispatcher, config: Config) -> UpdateContextMiddleware:
+    """
+    Middleware апдейтов в порядке выполнения. Dispatcher создаётся
+    с disable_fsm=True: FSM-middleware (dispatcher.fsm) встаёт после
+    очереди пользователя — апдейт читает состояние, уже записанное
+    предыдущим апдейтом того же пользователя.
+
+    Возвращает первый middleware — он считает принятые апдейты
+    для остановки.
+    """
+    updates = UpdateContextMiddleware(slow_threshold=config.updates.slow_threshold)
+    dispatcher.update.outer_middleware(updates)
+    # флуд отсекаем до очереди пользователя и до БД
+    dispatcher.update.outer_middleware(
+        ThrottlingMiddleware(
+            message_rate=config.throttle.message_rate,
+            message_burst=config.throttle.message_burst,
+            callback_rate=config.throttle.callback_rate,
+            callback_burst=config.throttle.callback_burst,
+        )
+    )
+    # очередь пользователя — до чтения FSM и всего, что ждёт БД,
+    # иначе апдейт видит состояние до обработки предыдущего
+    lanes = UserLaneMiddleware(
+        lanes=config.updates.lanes,
+        max_in_flight=config.updates.max_in_flight,
+    )
+    dispatcher.update.outer_middleware(lanes)
+    dispatcher.update.outer_middleware(dispatcher.fsm)
+    # настройки + ui_state пользователя одним запросом на апдейт
+    dispatcher.update.outer_middleware(UserContextMiddleware())
+
+    # имя хендлера для метрик; inner-middleware dp действуют и во вложенных роутерах
+    dispatcher.message.middleware(HandlerNameMiddleware())
+    dispatcher.callback_query.middleware(HandlerNameMiddleware())
+    # ушли с пикера дедлайна — больше не ждём срок текстом
+    dispatcher.message.outer_middleware(PickerExitMiddleware())
+    dispatcher.callback_query.outer_middleware(PickerExitMiddleware())
+    return updates
+
+
+async def _drain_updates(updates: UpdateContextMiddleware) -> None:
+    # задачи апдейтов, созданные последним getUpdates, но ещё не запущенные,
+    # стартуют за один проход loop и до первого await попадают в счётчик
+    await asyncio.sleep(0)
+    if updates.in_flight:
+        logger.info("Ждём %d апдейтов в обработке", updates.in_flight)
+    await updates.wait_idle()
+
+
+async def run_bot(config: Config, lifecycle: Lifecycle) -> None:
+    """
+    Приём апдейтов: webhook, если задан WEBHOOK_URL, иначе long polling.
+    Завершается, когда lifecycle начинает остановку.
+    """
+    # накопившиеся за время деплоя апдейты не выбрасываем
+    if config.webhook.url:
+        await run_webhook(config, lifecycle)
+    else:
+        await bot.delete_webhook(drop_pending_updates=False)
+        if lifecycle.stopping.is_set():
+            return
+        lifecycle.on_stop_intake("polling", dp.stop_polling)
+        # сигналы и закрытие сессии — забота lifecycle: после остановки
+        # polling хендлеры ещё дорабатывают и ходят в Bot API
+        await dp.start_polling(bot, handle_signals=False, close_bot_session=False)
+
+
+async def run_webhook(config: Config, lifecycle: Lifecycle) -> None:
+    """
+    Режим webhook: Telegram шлёт апдейты на WEBHOOK_URL + WEBHOOK_PATH,
+    за балансировщиком может стоять несколько реплик.
+    Нотифаер в этом случае по умолчанию не встроен (NOTIFIER_IN_BOT=false):
+    его запускают одним отдельным процессом, иначе каждая реплика
+    разошлёт напоминания.
+    """
+    wh = config.webhook
+    if not wh.secret:
+        raise RuntimeError("WEBHOOK_SECRET не задан — без него webhook принимал бы чужие запросы")
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    runner = await start_webhook_server(bot, dp, wh.host, wh.port, wh.path, wh.secret)
+    try:
+        # set_webhook идемпотентен — реплики могут вызывать его одновременно
+        await bot.set_webhook(
+            url=wh.url + wh.path,
+            secret_token=wh.secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=wh.max_connections,
+            drop_pending_updates=False,
+        )
+        await lifecycle.stopping.wait()
+    finally:
+        # новые запросы не принимаем, текущие (апдейты в обработке) дожидаемся
+        await runner.cleanup()
 
 
 if __name__ == "__main__":
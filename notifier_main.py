@@ -0,0 +1,81 @@
+# notifier_main.py
+"""
+Отдельный процесс нотифаера: python -m notifier_main
+
+Импортирует только хранилище и Bot-клиент (без хендлеров и диспетчера),
+со своим пулом соединений. В процессе бота при этом нужно выключить
+встроенный нотифаер: NOTIFIER_IN_BOT=false.
+"""
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from config.config import load_config, Config
+from app.db.core import init_db_and_schema, close_db
+from app.services.lifecycle import Lifecycle
+from app.services.notifier import notifier
+from app.services.metrics_server import start_metrics_server
+from app.middlewares.outbound import OutboundSchedulerMiddleware
+from app.utils.http_session import build_session
+
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    config: Config = load_config()
+
+    logging.basicConfig(
+        level=logging.getLevelName(config.log.level),
+        format=config.log.format,
+    )
+
+    await init_db_and_schema(
+        min_size=config.notifier.pool_min_size,
+        max_size=config.notifier.pool_max_size,
+    )
+    logger.info("Starting notifier")
+
+    # SIGTERM: текущая задача дорабатывает (отправка + сброс дедлайна), потом выход
+    lifecycle = Lifecycle(timeout=config.updates.shutdown_timeout)
+    lifecycle.install_signal_handlers()
+
+    if config.notifier.metrics_port:
+        metrics_runner = await start_metrics_server(
+            config.metrics.host, config.notifier.metrics_port
+        )
+        lifecycle.on_close("metrics", metrics_runner.cleanup)
+
+    # в отдельном процессе интерактивных запросов нет — одна сессия нотифаера
+    bot = Bot(
+        token=config.bot.token,
+        session=build_session(
+            pool_size=config.http.notifier_pool_size,
+            keepalive_timeout=config.http.keepalive_timeout,
+            request_timeout=config.http.request_timeout,
+        ),
+    )
+    # отдельный процесс делит с ботом лимит Telegram — держим свой темп
+    bot.session.middleware(
+        OutboundSchedulerMiddleware(
+            global_rate=config.outbound.global_rate,
+            global_burst=config.outbound.global_burst,
+            chat_rate=config.outbound.chat_rate,
+            chat_burst=config.outbound.chat_burst,
+        )
+    )
+    lifecycle.on_close("bot session", bot.session.close)
+    lifecycle.on_close("db", close_db)
+
+    await lifecycle.serve(
+        notifier(
+            bot,
+            interval_seconds=config.notifier.interval_seconds,
+            stop=lifecycle.stopping,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
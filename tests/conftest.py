@@ -0,0 +1,101 @@
+# tests/conftest.py
+"""
+Общие заготовки тестов: окружение для config, Bot без сети
+и конструкторы апдейтов. Тесты — обычные функции с asyncio.run,
+без плагинов pytest.
+"""
+import datetime as dt
+import os
+import sys
+import time
+from typing import Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ.setdefault("DATABASE_URL", "postgresql://test@127.0.0.1/test")
+
+import pytest  # noqa: E402
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import EditMessageText, SendMessage, TelegramMethod  # noqa: E402
+from aiogram.types import CallbackQuery, Chat, Message, Update, User  # noqa: E402
+
+USER_ID = 42
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия Bot без сети: запоминает вызовы и их время (monotonic),
+    sendMessage/editMessageText возвращают сообщение с message_id 77,
+    остальное — True.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[TelegramMethod] = []
+        self.times: List[float] = []
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Any = None) -> Any:
+        self.calls.append(method)
+        self.times.append(time.monotonic())
+        if isinstance(method, (SendMessage, EditMessageText)):
+            return Message(
+                message_id=77,
+                date=dt.datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def names(self) -> List[str]:
+        return [type(m).__name__ for m in self.calls]
+
+
+@pytest.fixture
+def bot() -> Bot:
+    return Bot("42:TEST", session=FakeSession())
+
+
+_USER = User(id=USER_ID, is_bot=False, first_name="u")
+_CHAT = Chat(id=USER_ID, type="private")
+
+
+def message_update(update_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=dt.datetime.now(),
+            chat=_CHAT,
+            from_user=_USER,
+            text=text,
+        ),
+    )
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    return Update(
+        update_id=update_id,
+        callback_query=CallbackQuery(
+            id=str(update_id),
+            from_user=_USER,
+            chat_instance="c",
+            data=data,
+            message=Message(
+                message_id=77,
+                date=dt.datetime.now(),
+                chat=_CHAT,
+                from_user=_USER,
+                text="screen",
+            ),
+        ),
+    )
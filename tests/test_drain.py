@@ -0,0 +1,65 @@
+# tests/test_drain.py
+import asyncio
+
+from aiogram import Dispatcher, F, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery
+
+from config.config import load_config
+from conftest import callback_update
+from main import _drain_updates, install_update_middlewares
+
+
+def _dispatcher(router: Router):
+    dp = Dispatcher(storage=MemoryStorage(), disable_fsm=True)
+    updates = install_update_middlewares(dp, load_config())
+    dp.include_router(router)
+    return dp, updates
+
+
+def test_drain_waits_for_updates_not_yet_started(bot):
+    """
+    Задачи апдейтов созданы (как после getUpdates), но ещё не запускались:
+    остановка всё равно их дожидается.
+    """
+    done = []
+    router = Router()
+
+    @router.callback_query(F.data.startswith("tap:"))
+    async def tap(query: CallbackQuery):
+        await asyncio.sleep(0.02)
+        done.append(query.data)
+
+    dp, updates = _dispatcher(router)
+
+    async def run():
+        tasks = [
+            asyncio.create_task(dp.feed_update(bot, callback_update(i, f"tap:{i}")))
+            for i in (1, 2)
+        ]
+        await _drain_updates(updates)
+        assert updates.in_flight == 0
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert done == ["tap:1", "tap:2"]
+
+
+def test_cancel_pending_stops_stuck_updates(bot):
+    router = Router()
+
+    @router.callback_query(F.data == "stuck")
+    async def stuck(query: CallbackQuery):
+        await asyncio.sleep(60)
+
+    dp, updates = _dispatcher(router)
+
+    async def run():
+        task = asyncio.create_task(dp.feed_update(bot, callback_update(1, "stuck")))
+        await asyncio.sleep(0.01)
+        assert updates.in_flight == 1
+        await updates.cancel_pending()
+        assert task.cancelled()
+        assert updates.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+# tests/test_listen_reconnect.py
+import asyncio
+
+import app.db.core as core
+
+
+class FakeListenConn:
+    def __init__(self) -> None:
+        self.channels = []
+        self.closed = False
+        self._on_terminate = None
+
+    async def add_listener(self, channel, callback):
+        self.channels.append(channel)
+
+    def add_termination_listener(self, callback):
+        self._on_terminate = callback
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def fetchval(self, query, timeout=None):
+        return 1
+
+    def terminate(self) -> None:
+        self.closed = True
+
+    async def close(self) -> None:
+        self.closed = True
+
+    def drop(self) -> None:
+        # обрыв со стороны сервера
+        self.closed = True
+        self._on_terminate(self)
+
+
+def test_lost_listen_connection_is_restored_and_caches_reset(monkeypatch):
+    conns = []
+    resets = []
+
+    async def connect(dsn):
+        conns.append(FakeListenConn())
+        return conns[-1]
+
+    monkeypatch.setattr(core.asyncpg, "connect", connect)
+
+    async def run():
+        await core.listen("a", lambda payload: None, on_reconnect=lambda: resets.append("a"))
+        await core.listen("b", lambda payload: None)
+        assert len(conns) == 1 and conns[0].channels == ["a", "b"]
+
+        conns[0].drop()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert len(conns) == 2
+        assert conns[1].channels == ["a", "b"]
+        assert resets == ["a"]
+
+        await core.close_db()
+        assert conns[1].closed
+
+    asyncio.run(run())
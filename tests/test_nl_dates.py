@@ -0,0 +1,42 @@
+# tests/test_nl_dates.py
+import datetime as dt
+
+import pytest
+
+from app.utils.nl_dates import split_deadline
+
+# понедельник, полдень; пользователь в UTC
+NOW = dt.datetime(2026, 10, 19, 12, 0)
+
+
+def _utc(*args: int) -> dt.datetime:
+    return dt.datetime(*args, tzinfo=dt.timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "text, head, due",
+    [
+        ("Купить молоко завтра 9:00", "Купить молоко", _utc(2026, 10, 20, 9, 0)),
+        ("Полить цветы через 2 часа", "Полить цветы", _utc(2026, 10, 19, 14, 0)),
+        ("Созвон в пт 18:00", "Созвон", _utc(2026, 10, 23, 18, 0)),
+        # предлог уходит вместе со сроком
+        ("Релиз 2.0 в 18:00", "Релиз 2.0", _utc(2026, 10, 19, 18, 0)),
+        ("Сделать к 18:00", "Сделать", _utc(2026, 10, 19, 18, 0)),
+        ("Встреча at 18:00", "Встреча", _utc(2026, 10, 19, 18, 0)),
+        # день недели — только после «до»/«к» или разделителя
+        ("Отчёт до пятницы", "Отчёт", _utc(2026, 10, 23, 9, 0)),
+        ("Отчёт к понедельнику", "Отчёт", _utc(2026, 10, 26, 9, 0)),
+        ("Позвонить маме, в субботу", "Позвонить маме", _utc(2026, 10, 24, 9, 0)),
+        ("Читать книгу Понедельник начинается в субботу",
+         "Читать книгу Понедельник начинается в субботу", None),
+        # числа в названии — не срок
+        ("Обновить python 3.12", "Обновить python 3.12", None),
+        ("Глава 10.5", "Глава 10.5", None),
+        ("Сдать 01.11 14:30", "Сдать 01.11 14:30", None),
+        ("Купить хлеб", "Купить хлеб", None),
+        # срок без текста задачи не отрезается
+        ("завтра", "завтра", None),
+    ],
+)
+def test_split_deadline(text, head, due):
+    assert split_deadline(text, NOW, 0) == (head, due)
@@ -0,0 +1,49 @@
+# tests/test_render_pacing.py
+import asyncio
+from collections import OrderedDict
+
+from aiogram import Dispatcher, F, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText
+from aiogram.types import CallbackQuery
+
+from app.utils import ui, ui_cache
+from app.utils.ui import show_screen
+from config.config import load_config
+from conftest import callback_update
+from main import install_update_middlewares
+
+WINDOW = 0.05
+
+
+def test_quick_taps_are_paced_through_the_middleware_stack(bot, monkeypatch):
+    """
+    Частые нажатия одного пользователя: апдейты идут по очереди
+    (UserLaneMiddleware), но экраны чата всё равно рисуются
+    не чаще раза в окно рендера.
+    """
+    monkeypatch.setattr(ui_cache, "_cache", OrderedDict({(42, 42): 77}))
+    monkeypatch.setattr(ui, "_render_window", WINDOW)
+
+    router = Router()
+
+    @router.callback_query(F.data.startswith("tap:"))
+    async def tap(query: CallbackQuery):
+        await show_screen(query, f"Экран {query.data}")
+
+    dp = Dispatcher(storage=MemoryStorage(), disable_fsm=True)
+    install_update_middlewares(dp, load_config())
+    dp.include_router(router)
+
+    async def run():
+        await asyncio.gather(
+            *(dp.feed_update(bot, callback_update(i, f"tap:{i}")) for i in range(1, 7))
+        )
+
+    asyncio.run(run())
+
+    session = bot.session
+    renders = [t for m, t in zip(session.calls, session.times) if isinstance(m, EditMessageText)]
+    assert len(renders) == 6
+    gaps = [b - a for a, b in zip(renders, renders[1:])]
+    assert min(gaps) >= WINDOW * 0.9
@@ -0,0 +1,51 @@
+# tests/test_throttle_hint.py
+import asyncio
+
+from aiogram import Dispatcher, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+
+from app.middlewares import ThrottlingMiddleware, UpdateContextMiddleware
+from app.middlewares import outbound
+from app.services import cleanup
+from conftest import message_update
+
+
+def test_throttle_hint_is_sent_outside_the_update(bot, monkeypatch):
+    """
+    Лишнее сообщение: апдейт завершается без вызовов Bot API,
+    подсказку отправляет воркер cleanup с фоновым приоритетом.
+    """
+    monkeypatch.setattr(cleanup, "_hints", {})
+    monkeypatch.setattr(cleanup, "_queues", {})
+    priorities = []
+
+    async def record_priority(make_request, bot, method):
+        priorities.append(outbound._priority(method))
+        return await make_request(bot, method)
+
+    bot.session.middleware(record_priority)
+
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        pass
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.update.outer_middleware(UpdateContextMiddleware())
+    dp.update.outer_middleware(ThrottlingMiddleware(message_rate=0.001, message_burst=1))
+    dp.include_router(router)
+
+    async def run():
+        await dp.feed_update(bot, message_update(1, "a"))
+        await dp.feed_update(bot, message_update(2, "b"))
+        assert bot.session.calls == []
+        assert cleanup._queues == {42: [2]}
+
+        await cleanup.send_hints(bot)
+        assert [type(m) for m in bot.session.calls] == [SendMessage]
+        assert priorities == [outbound.NOTIFICATION]
+
+    asyncio.run(run())
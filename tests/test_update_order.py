@@ -0,0 +1,68 @@
+# tests/test_update_order.py
+import asyncio
+
+from aiogram import Dispatcher, F, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Message
+
+import app.utils.user_context as user_context
+from app.states.todo_states import TodoStates
+from config.config import load_config
+from conftest import callback_update, message_update
+from main import install_update_middlewares
+
+
+async def _empty_context(user_id, chat_id, with_ui=True):
+    return {
+        "tz_offset_minutes": 0,
+        "web_token": "t",
+        "digest_hour": None,
+        "is_unreachable": False,
+        "message_id": None,
+    }
+
+
+def _dispatcher(router: Router) -> Dispatcher:
+    dp = Dispatcher(storage=MemoryStorage(), disable_fsm=True)
+    install_update_middlewares(dp, load_config())
+    dp.include_router(router)
+    return dp
+
+
+def test_second_update_sees_state_set_by_first(bot, monkeypatch):
+    """
+    «Добавить задачу» и сразу текст задачи: текст должен попасть
+    в состояние, выставленное первым хендлером, а не в «мусор».
+    """
+    monkeypatch.setattr(user_context, "load_user_context", _empty_context)
+    seen = []
+    router = Router()
+
+    @router.callback_query(F.data == "cmd:add")
+    async def add(query: CallbackQuery, state: FSMContext):
+        # хендлер ждёт БД/сеть, пока второй апдейт уже пришёл
+        await asyncio.sleep(0.05)
+        await state.set_state(TodoStates.add_text)
+        seen.append("add")
+
+    @router.message(StateFilter(TodoStates.add_text))
+    async def add_text(message: Message, state: FSMContext):
+        seen.append("text")
+        await state.clear()
+
+    @router.message()
+    async def trash(message: Message):
+        seen.append("trash")
+
+    dp = _dispatcher(router)
+
+    async def run():
+        await asyncio.gather(
+            dp.feed_update(bot, callback_update(1, "cmd:add")),
+            dp.feed_update(bot, message_update(2, "Купить хлеб")),
+        )
+
+    asyncio.run(run())
+    assert seen == ["add", "text"]
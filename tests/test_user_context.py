@@ -0,0 +1,91 @@
+# tests/test_user_context.py
+import asyncio
+from collections import OrderedDict
+
+from aiogram import Dispatcher, F, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery
+
+import app.utils.user_context as user_context
+from app.utils import ui_cache
+from config.config import load_config
+from conftest import callback_update
+from main import install_update_middlewares
+
+
+def _run(bot, router: Router, monkeypatch, unreachable: bool = False):
+    loads, cleared = [], []
+
+    async def load(user_id, chat_id, with_ui=True):
+        loads.append(with_ui)
+        return {
+            "tz_offset_minutes": 180,
+            "web_token": "t",
+            "digest_hour": None,
+            "is_unreachable": unreachable,
+            "message_id": 77 if with_ui else None,
+        }
+
+    async def clear(user_id):
+        cleared.append(user_id)
+
+    monkeypatch.setattr(user_context, "load_user_context", load)
+    monkeypatch.setattr(user_context, "clear_user_unreachable", clear)
+    monkeypatch.setattr(ui_cache, "_cache", OrderedDict())
+
+    dp = Dispatcher(storage=MemoryStorage(), disable_fsm=True)
+    install_update_middlewares(dp, load_config())
+    dp.include_router(router)
+    asyncio.run(dp.feed_update(bot, callback_update(1, "tap")))
+    return loads, cleared
+
+
+def test_update_without_settings_does_not_load_context(bot, monkeypatch):
+    router = Router()
+
+    @router.callback_query(F.data == "tap")
+    async def tap(query: CallbackQuery):
+        await query.answer()
+
+    loads, cleared = _run(bot, router, monkeypatch)
+    assert loads == []
+    assert cleared == []
+
+
+def test_context_is_loaded_once_and_primes_ui_cache(bot, monkeypatch):
+    offsets = []
+    router = Router()
+
+    @router.callback_query(F.data == "tap")
+    async def tap(query: CallbackQuery):
+        offsets.append(await user_context.get_tz_offset(query.from_user.id))
+        offsets.append(await user_context.get_tz_offset(query.from_user.id))
+
+    loads, cleared = _run(bot, router, monkeypatch)
+    assert offsets == [180, 180]
+    assert loads == [True]
+    assert ui_cache.has(42, 42)
+    assert cleared == []
+
+
+def test_known_screen_skips_ui_state(bot, monkeypatch):
+    router = Router()
+
+    @router.callback_query(F.data == "tap")
+    async def tap(query: CallbackQuery):
+        ui_cache.prime(42, 42, 77)
+        await user_context.get_tz_offset(query.from_user.id)
+
+    loads, _ = _run(bot, router, monkeypatch)
+    assert loads == [False]
+
+
+def test_unreachable_flag_is_cleared_only_when_set(bot, monkeypatch):
+    router = Router()
+
+    @router.callback_query(F.data == "tap")
+    async def tap(query: CallbackQuery):
+        await user_context.get_tz_offset(query.from_user.id)
+
+    _, cleared = _run(bot, router, monkeypatch, unreachable=True)
+    assert cleared == [42]